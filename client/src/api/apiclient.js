@@ -1,12 +1,19 @@
 const BASE_URL = import.meta.env.VITE_API_URL || 'http://127.0.0.1:5000';
 
+let authToken = null;
+
+export function setAuthToken(token) {
+  authToken = token;
+}
+
 async function request(path, options = {}) {
   const res = await fetch(`${BASE_URL}${path}`, {
+    ...options,
     headers: {
       'Content-Type': 'application/json',
+      ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
       ...(options.headers || {}),
     },
-    ...options,
   });
 
   let data = null;
@@ -29,6 +36,10 @@ export function login(email, password) {
   });
 }
 
+export function logout() {
+  return request('/logout', { method: 'POST' });
+}
+
 export function signup(form) {
   return request('/users', {
     method: 'POST',
@@ -74,6 +85,10 @@ export function fetchCategories(userId) {
   return request(`/categories?${params.toString()}`);
 }
 
+export function fetchUserStats(userId) {
+  return request(`/users/${userId}/stats`);
+}
+
 export function createCategory(name, userId) {
   return request('/categories', {
     method: 'POST',
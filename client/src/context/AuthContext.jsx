@@ -1,15 +1,19 @@
 import React, { createContext, useContext, useState } from 'react';
+import { logout, setAuthToken } from '../api/apiclient';
 
 const AuthContext = createContext(null);
 
 export function AuthProvider({ children }) {
   const [user, setUser] = useState(null);
 
-  function loginUser(userData) {
+  function loginUser(userData, token = null) {
+    setAuthToken(token);
     setUser(userData);
   }
 
   function logoutUser() {
+    logout().catch(() => {});
+    setAuthToken(null);
     setUser(null);
   }
 
@@ -1,20 +1,20 @@
 import React, { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
-import { fetchCategories } from '../api/apiclient';
+import { fetchUserStats } from '../api/apiclient';
 import { useAuth } from '../context/AuthContext';
 
 function DashboardPage() {
   const { user } = useAuth();
-  const [categories, setCategories] = useState([]);
+  const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
   useEffect(() => {
     if (!user) return;
 
-    fetchCategories(user.id)
+    fetchUserStats(user.id)
       .then((data) => {
-        setCategories(data);
+        setStats(data);
         setLoading(false);
       })
       .catch((err) => {
@@ -34,10 +34,14 @@ function DashboardPage() {
   return (
     <div className="dashboard-page">
       <h2 className="page-title">Dashboard</h2>
-      <p className="page-subtitle">Select a category to view its items.</p>
+      <p className="page-subtitle">
+        {stats.item_count} items, {stats.review_count} reviews
+        {stats.average_rating !== null && `, average rating ${stats.average_rating}`}.
+        Select a category to view its items.
+      </p>
 
       <div className="dashboard-grid">
-        {categories.map((category) => (
+        {stats.categories.map((category) => (
           <div key={category.id}>
             <Link
               key={category.id}
@@ -45,6 +49,7 @@ function DashboardPage() {
               className="dashboard-tile"
             >
               <span className="dashboard-tile-name">{category.name}</span>
+              <span className="dashboard-tile-count">{category.item_count} items</span>
             </Link>
           </div>
         ))}
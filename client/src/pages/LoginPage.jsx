@@ -26,7 +26,7 @@ function LoginPage() {
 
     try {
       const data = await login(form.email, form.password);
-      loginUser(data.user);
+      loginUser(data.user, data.token);
       navigate('/');
     } catch (err) {
       setError(err.message);
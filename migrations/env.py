@@ -45,6 +45,14 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# item_search is created by DDL in server/search.py rather than declared in
+# the models, and its migrations are written by hand. On SQLite it is an
+# FTS5 table with item_search_* shadow tables.
+def include_object(object, name, type_, reflected, compare_to):
+    table = name if type_ == 'table' else getattr(object.table, 'name', None)
+    return not (table or '').startswith('item_search')
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -65,7 +73,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -100,6 +109,7 @@ def run_migrations_online():
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
+            include_object=include_object,
             **conf_args
         )
 
@@ -0,0 +1,40 @@
+"""composite primary keys for item links
+
+Revision ID: a4f1c9e2d7b3
+Revises: f2b6d9c41e85
+Create Date: 2026-10-18 13:05:41.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f1c9e2d7b3'
+down_revision = 'f2b6d9c41e85'
+branch_labels = None
+depends_on = None
+
+
+# (item_id, <target>_id) becomes the primary key, replacing both the
+# surrogate id and the unique constraint that duplicated it. The
+# reverse (<target>_id, item_id) indexes from b7d2f4e81c36 stay.
+LINK_TABLES = [
+    ('item_tags', 'tag_id', 'uix_item_tag'),
+    ('item_creators', 'creator_id', 'uix_item_creator'),
+]
+
+
+def upgrade():
+    for table, target_column, unique_name in LINK_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('id')
+            batch_op.drop_constraint(unique_name, type_='unique')
+            batch_op.create_primary_key(f'{table}_pkey', ['item_id', target_column])
+
+
+def downgrade():
+    for table, target_column, unique_name in reversed(LINK_TABLES):
+        op.drop_constraint(f'{table}_pkey', table, type_='primary')
+        op.execute(f'ALTER TABLE {table} ADD COLUMN id SERIAL PRIMARY KEY')
+        op.create_unique_constraint(unique_name, table, ['item_id', target_column])
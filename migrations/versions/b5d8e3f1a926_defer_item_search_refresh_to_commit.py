@@ -0,0 +1,204 @@
+"""defer item search refresh to commit
+
+Revision ID: b5d8e3f1a926
+Revises: e4b7a2c9d150
+Create Date: 2026-10-18 16:40:12.502718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d8e3f1a926'
+down_revision = 'e4b7a2c9d150'
+branch_labels = None
+depends_on = None
+
+
+# The write triggers queue changed item ids per transaction instead of
+# rebuilding documents straight away. A deferred constraint trigger
+# rebuilds each queued item once at commit, so an item inserted with
+# tags and creators is no longer rebuilt once per table.
+UPGRADE = [
+    """
+    CREATE UNLOGGED TABLE item_search_pending (
+        txid BIGINT NOT NULL,
+        item_id INTEGER NOT NULL,
+        PRIMARY KEY (txid, item_id)
+    )
+    """,
+    """
+    CREATE UNLOGGED TABLE item_search_flushes (
+        txid BIGINT PRIMARY KEY
+    )
+    """,
+    """
+    CREATE FUNCTION item_search_queue(targets INTEGER[]) RETURNS VOID AS $$
+    BEGIN
+        IF cardinality(targets) = 0 THEN
+            RETURN;
+        END IF;
+        INSERT INTO item_search_pending (txid, item_id)
+        SELECT txid_current(), unnest(targets)
+        ON CONFLICT DO NOTHING;
+        INSERT INTO item_search_flushes (txid) VALUES (txid_current())
+        ON CONFLICT DO NOTHING;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE FUNCTION item_search_flush() RETURNS TRIGGER AS $$
+    DECLARE
+        targets INTEGER[];
+    BEGIN
+        WITH flushed AS (
+            DELETE FROM item_search_pending WHERE txid = NEW.txid RETURNING item_id
+        )
+        SELECT array_agg(item_id) INTO targets FROM flushed;
+        DELETE FROM item_search_flushes WHERE txid = NEW.txid;
+        PERFORM item_search_refresh(targets);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE CONSTRAINT TRIGGER item_search_flush AFTER INSERT ON item_search_flushes
+    DEFERRABLE INITIALLY DEFERRED FOR EACH ROW
+    EXECUTE FUNCTION item_search_flush()
+    """,
+]
+
+
+# Aggregates tags and creators once for all targets instead of per item,
+# since the flush at commit can pass a whole bulk import's ids.
+REFRESH = """
+    CREATE OR REPLACE FUNCTION item_search_refresh(targets INTEGER[]) RETURNS VOID AS $$
+    BEGIN
+        INSERT INTO item_search (item_id, user_id, document)
+        SELECT i.id,
+            i.user_id,
+            setweight(to_tsvector('simple', i.title), 'A')
+            || setweight(to_tsvector('simple', coalesce(t.names, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(c.names, '')), 'B')
+        FROM items i
+        LEFT JOIN (
+            SELECT it.item_id, string_agg(t.name, ' ') AS names
+            FROM item_tags it JOIN tags t ON t.id = it.tag_id
+            WHERE it.item_id = ANY (targets)
+            GROUP BY it.item_id
+        ) t ON t.item_id = i.id
+        LEFT JOIN (
+            SELECT ic.item_id, string_agg(c.name, ' ') AS names
+            FROM item_creators ic JOIN creators c ON c.id = ic.creator_id
+            WHERE ic.item_id = ANY (targets)
+            GROUP BY ic.item_id
+        ) c ON c.item_id = i.id
+        WHERE i.id = ANY (targets)
+        ON CONFLICT (item_id) DO UPDATE
+            SET user_id = EXCLUDED.user_id, document = EXCLUDED.document;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+OLD_REFRESH = """
+    CREATE OR REPLACE FUNCTION item_search_refresh(targets INTEGER[]) RETURNS VOID AS $$
+    BEGIN
+        INSERT INTO item_search (item_id, user_id, document)
+        SELECT i.id,
+            i.user_id,
+            setweight(to_tsvector('simple', i.title), 'A')
+            || setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(t.name, ' ')
+                FROM item_tags it JOIN tags t ON t.id = it.tag_id
+                WHERE it.item_id = i.id
+            ), '')), 'B')
+            || setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(c.name, ' ')
+                FROM item_creators ic JOIN creators c ON c.id = ic.creator_id
+                WHERE ic.item_id = i.id
+            ), '')), 'B')
+        FROM items i
+        WHERE i.id = ANY (targets)
+        ON CONFLICT (item_id) DO UPDATE
+            SET user_id = EXCLUDED.user_id, document = EXCLUDED.document;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+
+def trigger_functions(action):
+    """The item_search trigger functions, calling ``action`` with the
+    changed item ids."""
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION item_search_from_items() RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM {action}(ARRAY(SELECT id FROM changed));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION item_search_from_item_updates() RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM {action}(ARRAY(
+                SELECT changed.id
+                FROM changed JOIN previous ON previous.id = changed.id
+                WHERE changed.title IS DISTINCT FROM previous.title
+                   OR changed.user_id IS DISTINCT FROM previous.user_id
+            ));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION item_search_from_links() RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM {action}(ARRAY(SELECT DISTINCT item_id FROM changed));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION item_search_from_tags() RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM {action}(ARRAY(
+                SELECT DISTINCT it.item_id
+                FROM changed JOIN item_tags it ON it.tag_id = changed.id
+            ));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION item_search_from_creators() RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM {action}(ARRAY(
+                SELECT DISTINCT ic.item_id
+                FROM changed JOIN item_creators ic ON ic.creator_id = changed.id
+            ));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+    ]
+
+
+def upgrade():
+    op.execute(REFRESH)
+    for statement in UPGRADE:
+        op.execute(statement)
+    for statement in trigger_functions('item_search_queue'):
+        op.execute(statement)
+
+
+def downgrade():
+    for statement in trigger_functions('item_search_refresh'):
+        op.execute(statement)
+
+    op.drop_table('item_search_flushes')
+    op.drop_table('item_search_pending')
+    op.execute("DROP FUNCTION item_search_flush()")
+    op.execute("DROP FUNCTION item_search_queue(INTEGER[])")
+    op.execute(OLD_REFRESH)
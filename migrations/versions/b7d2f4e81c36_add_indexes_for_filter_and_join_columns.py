@@ -0,0 +1,58 @@
+"""add indexes for filter and join columns
+
+Revision ID: b7d2f4e81c36
+Revises: a1c4e7d2b9f0
+Create Date: 2026-10-18 10:02:17.554120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2f4e81c36'
+down_revision = 'a1c4e7d2b9f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # categories.user_id is already the leading column of
+    # uq_category_user_name, which serves list_categories.
+    with op.batch_alter_table('items', schema=None) as batch_op:
+        batch_op.create_index('ix_items_user_id_category_id', ['user_id', 'category_id'], unique=False)
+        batch_op.create_index('ix_items_user_id_title', ['user_id', 'title', 'id'], unique=False)
+        batch_op.create_index('ix_items_category_id', ['category_id'], unique=False)
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index('ix_reviews_item_id_id', ['item_id', 'id'], unique=False)
+        batch_op.create_index('ix_reviews_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('item_tags', schema=None) as batch_op:
+        batch_op.create_index('ix_item_tags_tag_id_item_id', ['tag_id', 'item_id'], unique=False)
+
+    with op.batch_alter_table('item_creators', schema=None) as batch_op:
+        batch_op.create_index('ix_item_creators_creator_id_item_id', ['creator_id', 'item_id'], unique=False)
+
+    with op.batch_alter_table('export_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_export_jobs_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('export_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_export_jobs_user_id'))
+
+    with op.batch_alter_table('item_creators', schema=None) as batch_op:
+        batch_op.drop_index('ix_item_creators_creator_id_item_id')
+
+    with op.batch_alter_table('item_tags', schema=None) as batch_op:
+        batch_op.drop_index('ix_item_tags_tag_id_item_id')
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_reviews_user_id')
+        batch_op.drop_index('ix_reviews_item_id_id')
+
+    with op.batch_alter_table('items', schema=None) as batch_op:
+        batch_op.drop_index('ix_items_category_id')
+        batch_op.drop_index('ix_items_user_id_title')
+        batch_op.drop_index('ix_items_user_id_category_id')
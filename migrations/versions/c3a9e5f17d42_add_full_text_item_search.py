@@ -0,0 +1,165 @@
+"""add full-text item search
+
+Revision ID: c3a9e5f17d42
+Revises: b7d2f4e81c36
+Create Date: 2026-10-18 11:26:53.902871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a9e5f17d42'
+down_revision = 'b7d2f4e81c36'
+branch_labels = None
+depends_on = None
+
+
+# item_search holds one weighted tsvector per item (title 'A', tag and
+# creator names 'B') and is kept current by statement-level triggers.
+UPGRADE = [
+    """
+    CREATE TABLE item_search (
+        item_id INTEGER PRIMARY KEY REFERENCES items (id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX ix_item_search_document ON item_search USING GIN (document)
+    """,
+    """
+    CREATE FUNCTION item_search_refresh(targets INTEGER[]) RETURNS VOID AS $$
+    BEGIN
+        INSERT INTO item_search (item_id, document)
+        SELECT i.id,
+            setweight(to_tsvector('simple', i.title), 'A')
+            || setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(t.name, ' ')
+                FROM item_tags it JOIN tags t ON t.id = it.tag_id
+                WHERE it.item_id = i.id
+            ), '')), 'B')
+            || setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(c.name, ' ')
+                FROM item_creators ic JOIN creators c ON c.id = ic.creator_id
+                WHERE ic.item_id = i.id
+            ), '')), 'B')
+        FROM items i
+        WHERE i.id = ANY (targets)
+        ON CONFLICT (item_id) DO UPDATE SET document = EXCLUDED.document;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE FUNCTION item_search_from_items() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM item_search_refresh(ARRAY(SELECT id FROM changed));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE FUNCTION item_search_from_links() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM item_search_refresh(ARRAY(SELECT DISTINCT item_id FROM changed));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE FUNCTION item_search_from_tags() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM item_search_refresh(ARRAY(
+            SELECT DISTINCT it.item_id
+            FROM changed JOIN item_tags it ON it.tag_id = changed.id
+        ));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE FUNCTION item_search_from_creators() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM item_search_refresh(ARRAY(
+            SELECT DISTINCT ic.item_id
+            FROM changed JOIN item_creators ic ON ic.creator_id = changed.id
+        ));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER items_search_insert AFTER INSERT ON items
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_items()
+    """,
+    """
+    CREATE TRIGGER items_search_update AFTER UPDATE ON items
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_items()
+    """,
+    """
+    CREATE TRIGGER item_tags_search_insert AFTER INSERT ON item_tags
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_links()
+    """,
+    """
+    CREATE TRIGGER item_tags_search_delete AFTER DELETE ON item_tags
+    REFERENCING OLD TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_links()
+    """,
+    """
+    CREATE TRIGGER item_creators_search_insert AFTER INSERT ON item_creators
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_links()
+    """,
+    """
+    CREATE TRIGGER item_creators_search_delete AFTER DELETE ON item_creators
+    REFERENCING OLD TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_links()
+    """,
+    """
+    CREATE TRIGGER tags_search_update AFTER UPDATE ON tags
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_tags()
+    """,
+    """
+    CREATE TRIGGER creators_search_update AFTER UPDATE ON creators
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_creators()
+    """,
+]
+
+TRIGGERS = [
+    ('items_search_insert', 'items'),
+    ('items_search_update', 'items'),
+    ('item_tags_search_insert', 'item_tags'),
+    ('item_tags_search_delete', 'item_tags'),
+    ('item_creators_search_insert', 'item_creators'),
+    ('item_creators_search_delete', 'item_creators'),
+    ('tags_search_update', 'tags'),
+    ('creators_search_update', 'creators'),
+]
+
+FUNCTIONS = [
+    'item_search_from_items()',
+    'item_search_from_links()',
+    'item_search_from_tags()',
+    'item_search_from_creators()',
+    'item_search_refresh(INTEGER[])',
+]
+
+
+def upgrade():
+    for statement in UPGRADE:
+        op.execute(statement)
+
+    op.execute("SELECT item_search_refresh(ARRAY(SELECT id FROM items))")
+
+
+def downgrade():
+    for trigger, table in TRIGGERS:
+        op.execute(f"DROP TRIGGER {trigger} ON {table}")
+    for function in FUNCTIONS:
+        op.execute(f"DROP FUNCTION {function}")
+    op.drop_table('item_search')
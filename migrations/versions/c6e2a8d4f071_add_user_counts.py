@@ -0,0 +1,50 @@
+"""add user counts
+
+Revision ID: c6e2a8d4f071
+Revises: b5d8e3f1a926
+Create Date: 2026-10-18 18:02:47.381226
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e2a8d4f071'
+down_revision = 'b5d8e3f1a926'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=10), nullable=False),
+    sa.Column('key_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'kind', 'key_id')
+    )
+
+    op.execute("""
+        INSERT INTO user_counts (user_id, kind, key_id, total)
+        SELECT user_id, 'category', category_id, count(*)
+        FROM items
+        GROUP BY user_id, category_id
+        UNION ALL
+        SELECT i.user_id, 'tag', it.tag_id, count(*)
+        FROM item_tags it JOIN items i ON i.id = it.item_id
+        GROUP BY i.user_id, it.tag_id
+        UNION ALL
+        SELECT i.user_id, 'creator', ic.creator_id, count(*)
+        FROM item_creators ic JOIN items i ON i.id = ic.item_id
+        GROUP BY i.user_id, ic.creator_id
+        UNION ALL
+        SELECT i.user_id, 'rating', coalesce(r.rating, 0), count(*)
+        FROM reviews r JOIN items i ON i.id = r.item_id
+        GROUP BY i.user_id, coalesce(r.rating, 0)
+    """)
+
+
+def downgrade():
+    op.drop_table('user_counts')
@@ -0,0 +1,43 @@
+"""cascade deletes from items
+
+Revision ID: c8d4a7f3e915
+Revises: a4f1c9e2d7b3
+Create Date: 2026-10-18 14:02:19.640582
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8d4a7f3e915'
+down_revision = 'a4f1c9e2d7b3'
+branch_labels = None
+depends_on = None
+
+
+# (table, column, referenced table). Deleting an item, tag or creator
+# removes its reviews and link rows in the same statement.
+FOREIGN_KEYS = [
+    ('reviews', 'item_id', 'items'),
+    ('item_tags', 'item_id', 'items'),
+    ('item_tags', 'tag_id', 'tags'),
+    ('item_creators', 'item_id', 'items'),
+    ('item_creators', 'creator_id', 'creators'),
+]
+
+
+def replace_foreign_keys(ondelete):
+    for table, column, referenced in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referenced, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    replace_foreign_keys(None)
@@ -0,0 +1,63 @@
+"""add item rating aggregates
+
+Revision ID: d5e1b8a04f63
+Revises: c3a9e5f17d42
+Create Date: 2026-10-18 12:48:05.117392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e1b8a04f63'
+down_revision = 'c3a9e5f17d42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute("""
+        UPDATE items SET
+            rating_count = (SELECT count(r.rating) FROM reviews r WHERE r.item_id = items.id),
+            rating_sum = (SELECT coalesce(sum(r.rating), 0) FROM reviews r WHERE r.item_id = items.id)
+    """)
+
+    # Only title changes affect the search document, so rating updates
+    # should not rebuild it.
+    op.execute("""
+        CREATE FUNCTION item_search_from_item_updates() RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM item_search_refresh(ARRAY(
+                SELECT changed.id
+                FROM changed JOIN previous ON previous.id = changed.id
+                WHERE changed.title IS DISTINCT FROM previous.title
+            ));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER items_search_update ON items")
+    op.execute("""
+        CREATE TRIGGER items_search_update AFTER UPDATE ON items
+        REFERENCING OLD TABLE AS previous NEW TABLE AS changed FOR EACH STATEMENT
+        EXECUTE FUNCTION item_search_from_item_updates()
+    """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER items_search_update ON items")
+    op.execute("""
+        CREATE TRIGGER items_search_update AFTER UPDATE ON items
+        REFERENCING NEW TABLE AS changed FOR EACH STATEMENT
+        EXECUTE FUNCTION item_search_from_items()
+    """)
+    op.execute("DROP FUNCTION item_search_from_item_updates()")
+
+    with op.batch_alter_table('items', schema=None) as batch_op:
+        batch_op.drop_column('rating_sum')
+        batch_op.drop_column('rating_count')
@@ -0,0 +1,120 @@
+"""scope item search by user
+
+Revision ID: e4b7a2c9d150
+Revises: c8d4a7f3e915
+Create Date: 2026-10-18 15:21:44.318206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7a2c9d150'
+down_revision = 'c8d4a7f3e915'
+branch_labels = None
+depends_on = None
+
+
+# item_search gets a copy of each item's user_id, indexed, so a search
+# reads only the user's rows. The GIN index on document goes: its posting
+# lists for a common or prefix term cover every user's items, and the
+# planner combined it with the user filter at tens of milliseconds.
+REFRESH = """
+    CREATE OR REPLACE FUNCTION item_search_refresh(targets INTEGER[]) RETURNS VOID AS $$
+    BEGIN
+        INSERT INTO item_search (item_id, user_id, document)
+        SELECT i.id,
+            i.user_id,
+            setweight(to_tsvector('simple', i.title), 'A')
+            || setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(t.name, ' ')
+                FROM item_tags it JOIN tags t ON t.id = it.tag_id
+                WHERE it.item_id = i.id
+            ), '')), 'B')
+            || setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(c.name, ' ')
+                FROM item_creators ic JOIN creators c ON c.id = ic.creator_id
+                WHERE ic.item_id = i.id
+            ), '')), 'B')
+        FROM items i
+        WHERE i.id = ANY (targets)
+        ON CONFLICT (item_id) DO UPDATE
+            SET user_id = EXCLUDED.user_id, document = EXCLUDED.document;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+ITEM_UPDATES = """
+    CREATE OR REPLACE FUNCTION item_search_from_item_updates() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM item_search_refresh(ARRAY(
+            SELECT changed.id
+            FROM changed JOIN previous ON previous.id = changed.id
+            WHERE changed.title IS DISTINCT FROM previous.title
+               OR changed.user_id IS DISTINCT FROM previous.user_id
+        ));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+OLD_REFRESH = """
+    CREATE OR REPLACE FUNCTION item_search_refresh(targets INTEGER[]) RETURNS VOID AS $$
+    BEGIN
+        INSERT INTO item_search (item_id, document)
+        SELECT i.id,
+            setweight(to_tsvector('simple', i.title), 'A')
+            || setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(t.name, ' ')
+                FROM item_tags it JOIN tags t ON t.id = it.tag_id
+                WHERE it.item_id = i.id
+            ), '')), 'B')
+            || setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(c.name, ' ')
+                FROM item_creators ic JOIN creators c ON c.id = ic.creator_id
+                WHERE ic.item_id = i.id
+            ), '')), 'B')
+        FROM items i
+        WHERE i.id = ANY (targets)
+        ON CONFLICT (item_id) DO UPDATE SET document = EXCLUDED.document;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+OLD_ITEM_UPDATES = """
+    CREATE OR REPLACE FUNCTION item_search_from_item_updates() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM item_search_refresh(ARRAY(
+            SELECT changed.id
+            FROM changed JOIN previous ON previous.id = changed.id
+            WHERE changed.title IS DISTINCT FROM previous.title
+        ));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    op.add_column('item_search', sa.Column('user_id', sa.Integer(), nullable=True))
+    op.execute("""
+        UPDATE item_search s SET user_id = i.user_id
+        FROM items i
+        WHERE i.id = s.item_id
+    """)
+    op.alter_column('item_search', 'user_id', nullable=False)
+
+    op.execute(REFRESH)
+    op.execute(ITEM_UPDATES)
+    op.create_index('ix_item_search_user_id', 'item_search', ['user_id'])
+    op.drop_index('ix_item_search_document', table_name='item_search')
+
+
+def downgrade():
+    op.create_index('ix_item_search_document', 'item_search', ['document'], postgresql_using='gin')
+    op.drop_index('ix_item_search_user_id', table_name='item_search')
+
+    op.execute(OLD_ITEM_UPDATES)
+    op.execute(OLD_REFRESH)
+    op.drop_column('item_search', 'user_id')
@@ -0,0 +1,27 @@
+"""add lower(name) indexes for autocomplete
+
+Revision ID: f2b6d9c41e85
+Revises: e8f3c6d29a17
+Create Date: 2026-10-18 15:11:52.207734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d9c41e85'
+down_revision = 'e8f3c6d29a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # "C" collation lets LIKE 'prefix%' and ORDER BY both use the index.
+    op.create_index('ix_tags_lower_name', 'tags', [sa.text('lower(name::text COLLATE "C")')], unique=False)
+    op.create_index('ix_creators_lower_name', 'creators', [sa.text('lower(name::text COLLATE "C")')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_creators_lower_name', table_name='creators')
+    op.drop_index('ix_tags_lower_name', table_name='tags')
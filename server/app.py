@@ -1,49 +1,252 @@
 import os
-import io
-import csv
-import base64
-import mailtrap as mt
+import queue
 
 from .config import Config
 from flask import Flask, jsonify
 from flask_migrate import Migrate
 from flask_cors import CORS
 from dotenv import load_dotenv
-from flask import request, jsonify, current_app
-from .models import db, User, Category, Item, Tag, Creator, Review
-import smtplib
-import threading
+import click
+from flask import request, jsonify, stream_with_context, g
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from .models import (
+    db,
+    User,
+    Category,
+    Item,
+    Tag,
+    Creator,
+    Review,
+    ItemTag,
+    ItemCreator,
+    ExportJob,
+)
+from .exports import iter_items_csv
+from .imports import ImportFormatError, parse_rows, import_items
+from .jobs import ExportWorkerPool
+from .associations import add_links, remove_links, replace_links
+from .search import search_terms, search_item_ids
+from .ratings import apply_rating_change, rebuild_rating_aggregates
+from .stats import (
+    add_category_count,
+    add_counts,
+    add_review_counts,
+    item_counts,
+    rebuild_user_counts,
+    user_stats,
+)
+from .cache import create_read_cache, create_stats_cache
+from .autocomplete import PREFIX_LIMIT, MAX_PREFIX_LIMIT, prefix_matches
+from .versions import (
+    TAGS_SCOPE,
+    CREATORS_SCOPE,
+    user_scope,
+    bump,
+    bump_all_users,
+    bump_item_owners,
+    versioned,
+)
+from .pagination import MAX_LIMIT, PaginationError, limit_arg, list_response
+from .mail import SMTPTransport, create_transport
+from .auth import SessionTokens, authenticate_request
+from .metrics import init_metrics
+from .database import configure_engines, read_replica
+from .json_provider import init_json_provider
+from .compression import init_compression
+from .serializers import (
+    review_to_dict,
+    user_to_dict,
+    category_to_dict,
+    tag_to_dict,
+    creator_to_dict,
+    export_job_to_dict,
+    FieldsetError,
+    parse_item_fieldset,
+    split_param,
+    item_serializer,
+    load_item_dict,
+    load_item_dicts,
+)
+from email.message import EmailMessage
 
 
 load_dotenv()
 
-def review_to_dict(review):
-    return {
-        "id": review.id,
-        "rating": review.rating,
-        "text": review.text,
-        "user_id": review.user_id,
-        "item_id": review.item_id,
-    }
-
-def user_to_dict(user):
-    return {
-        "id": user.id,
-        "username": user.username,
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-        "email": user.email,
-    }
-
-def create_app():
+def item_load_options():
+    """Loader options that fetch category, tags and creators for a whole
+    result set in one extra query each, instead of one per item."""
+    return (
+        selectinload(Item.category),
+        selectinload(Item.tags),
+        selectinload(Item.creators),
+    )
+
+def parse_rating(value):
+    """Return ``(rating, error)`` for an optional 1-5 rating."""
+    if value is None:
+        return None, None
+
+    try:
+        rating = int(value)
+    except (TypeError, ValueError):
+        return None, "Rating must be an integer between 1 and 5"
+
+    if rating < 1 or rating > 5:
+        return None, "Rating must be between 1 and 5"
+
+    return rating, None
+
+def id_list(value):
+    """Return ``value`` de-duplicated if it is a list of ints, else None."""
+    if not isinstance(value, list) or not all(isinstance(v, int) for v in value):
+        return None
+    return list(dict.fromkeys(value))
+
+def missing_ids(model, ids):
+    if not ids:
+        return set()
+    found = db.session.scalars(db.select(model.id).where(model.id.in_(ids)))
+    return set(ids) - set(found)
+
+def link_changes(data, model, label):
+    """Validate an ``{"add": [...], "remove": [...]}`` body against
+    ``model``; returns ``(add, remove, errors)``."""
+    add = id_list(data.get("add", []))
+    remove = id_list(data.get("remove", []))
+
+    if add is None or remove is None:
+        return None, None, ["add and remove must be lists of ids"]
+    if not add and not remove:
+        return None, None, ["Nothing to add or remove"]
+    if missing_ids(model, add):
+        return None, None, [f"One or more {label} do not exist"]
+
+    return add, remove, []
+
+def acting_user_id(claimed_id):
+    """Resolve who a write acts as; returns ``(user_id, error_response)``.
+
+    A session token settles it without a query. Without one, fall back
+    to the ``user_id`` the client sent, which must name a real user.
+    """
+    token = g.get("token")
+    if token:
+        if claimed_id is not None and claimed_id != token["uid"]:
+            return None, ({"errors": ["user_id does not match the session token"]}, 403)
+        return token["uid"], None
+
+    if claimed_id is None:
+        return None, ({"errors": ["Missing field: user_id"]}, 400)
+    if not User.query.get(claimed_id):
+        return None, ({"errors": ["User does not exist"]}, 400)
+    return claimed_id, None
+
+def requested_item_serializer():
+    """The item serializer for ``?fields=`` and ``?include=``; raises
+    ``FieldsetError`` for unknown names."""
+    fields, includes = parse_item_fieldset(
+        request.args.get("fields"),
+        request.args.get("include"),
+    )
+    return item_serializer(fields, includes)
+
+def requested_item_ids():
+    """Distinct ids from ``?ids=1,2,3`` in the order given; raises
+    ``ValueError``."""
+    try:
+        item_ids = list(dict.fromkeys(int(part) for part in split_param(request.args["ids"])))
+    except ValueError:
+        raise ValueError("ids must be a comma-separated list of integers")
+
+    if not item_ids:
+        raise ValueError("ids must contain at least one id")
+    if len(item_ids) > MAX_LIMIT:
+        raise ValueError(f"ids may contain at most {MAX_LIMIT} ids")
+    return item_ids
+
+def requested_user_scope():
+    user_id = request.args.get("user_id", type=int)
+    return user_scope(user_id) if user_id else None
+
+def export_query(user_id):
+    return (
+        db.select(Item)
+        .options(*item_load_options())
+        .filter_by(user_id=user_id)
+    )
+
+def create_app(config=None):
 
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.config.update(config or {})
+    configure_engines(app)
+    init_json_provider(app)
 
     db.init_app(app)
     Migrate(app, db)
     CORS(app)
 
+    app.extensions["read_cache"] = create_read_cache(app)
+    app.extensions["stats_cache"] = create_stats_cache(app, app.extensions["read_cache"])
+    # One SMTP pool per process, so MAIL_POOL_SIZE bounds its connections:
+    # /smtp-test shares the export transport when that is SMTP.
+    mail = app.extensions["mail"] = create_transport(app)
+    app.extensions["smtp"] = mail if isinstance(mail, SMTPTransport) else SMTPTransport(app)
+
+    export_jobs = app.extensions["export_jobs"] = ExportWorkerPool(
+        app,
+        lambda user_id, on_chunk: iter_items_csv(
+            export_query(user_id),
+            chunk_size=app.config["EXPORT_CHUNK_SIZE"],
+            on_chunk=on_chunk,
+        ),
+        mail,
+    )
+    if app.config["EXPORT_WORKERS_AUTOSTART"]:
+        export_jobs.start()
+
+    # Registered before authentication so rejected requests are timed too.
+    metrics = None
+    if app.config["METRICS_ENABLED"]:
+        with app.app_context():
+            metrics = init_metrics(app, [db.engine, *(
+                engine for key, engine in db.engines.items() if key is not None
+            )])
+        metrics.add_gauge(
+            "medialog_export_workers_busy",
+            "Export worker threads currently running a job.",
+            lambda: export_jobs.busy,
+        )
+        metrics.add_gauge(
+            "medialog_export_queue_depth",
+            "Export jobs waiting for a worker.",
+            export_jobs.queue.qsize,
+        )
+    app.extensions["metrics"] = metrics
+    app.extensions["compression"] = init_compression(app)
+
+    app.extensions["session_tokens"] = SessionTokens(app)
+    app.before_request(authenticate_request)
+
+    @app.cli.command("rebuild-rating-aggregates")
+    def rebuild_rating_aggregates_command():
+        """Recompute every item's rating_count and rating_sum from reviews."""
+        fixed = rebuild_rating_aggregates()
+        if fixed:
+            bump_all_users()
+        db.session.commit()
+        click.echo(f"Rebuilt rating aggregates; {fixed} item(s) corrected.")
+
+    @app.cli.command("rebuild-user-counts")
+    def rebuild_user_counts_command():
+        """Recompute the per-user stats counts from items, links and reviews."""
+        rebuild_user_counts()
+        bump_all_users()
+        db.session.commit()
+        click.echo("Rebuilt user counts.")
+
     @app.route("/")
     def index():
         return jsonify({"message": "Medialog API is running"}), 200
@@ -81,18 +284,30 @@ def create_app():
     
     
     @app.get("/users")
+    @read_replica
     def list_users():
-        users = User.query.all()
-        return jsonify([user_to_dict(u) for u in users]), 200
+        return list_response(User.query, User.username, User.id, user_to_dict, paged=True)
     
     
     @app.get("/users/<int:user_id>")
+    @read_replica
     def get_user(user_id):
         user = User.query.get(user_id)
         if not user:
             return {"errors": [f"User with id {user_id} not found"]}, 404
 
         return user_to_dict(user), 200
+
+
+    @app.get("/users/<int:user_id>/stats")
+    @read_replica
+    @versioned(lambda: user_scope(request.view_args["user_id"]), cache="stats_cache")
+    def get_user_stats(user_id):
+        stats = user_stats(user_id)
+        if stats is None:
+            return {"errors": [f"User with id {user_id} not found"]}, 404
+
+        return stats, 200
     
 
     @app.post("/login")
@@ -114,8 +329,12 @@ def create_app():
         if user.password != password:
             return {"errors": ["Invalid email or password"]}, 401
 
+        tokens = app.extensions["session_tokens"]
+
         return {
             "message": "Login successful",
+            "token": tokens.issue(user),
+            "expires_in": tokens.ttl,
             "user": {
                 "id": user.id,
                 "username": user.username,
@@ -127,94 +346,162 @@ def create_app():
 
     
     
+    @app.post("/logout")
+    def logout():
+        token = g.get("token")
+        if not token:
+            return {"errors": ["A session token is required"]}, 401
+
+        app.extensions["session_tokens"].revoke(token)
+
+        return {"message": "Logged out"}, 200
+
+    
+    
     @app.post("/items")
     def create_item():
 
         data = request.get_json()
 
-        required_fields = ["title", "user_id", "category_id"]
+        required_fields = ["title", "category_id"]
         missing = [field for field in required_fields if field not in data]
 
         if missing:
             return {"errors": [f"Missing field: {m}" for m in missing]}, 400
         
-        user = User.query.get(data["user_id"])
-        category = Category.query.get(data["category_id"])
+        user_id, error = acting_user_id(data.get("user_id"))
+        if error:
+            return error
 
-        if not user:
-            return {"errors": ["User does not exist"]}, 400
+        category = Category.query.get(data["category_id"])
         if not category:
             return {"errors": ["Category does not exist"]}, 400
         
         new_item = Item(
             title=data["title"],
-            user_id=data["user_id"],
+            user_id=user_id,
             category_id=data["category_id"],
             image_url=data.get("image_url"),
         )
 
         db.session.add(new_item)
+        add_category_count(user_id, category.id, 1)
+        bump(user_scope(new_item.user_id))
         db.session.commit()
 
-        return {
-            "id": new_item.id,
-            "title": new_item.title,
-            "user_id": new_item.user_id,
-            "category_id": new_item.category_id,
-            "image_url": new_item.image_url,
-            "tags": [t.name for t in new_item.tags],
-            "creators": [c.name for c in new_item.creators],
-        }, 201
+        return load_item_dict(new_item.id), 201
+    
+    
+    @app.post("/items/bulk")
+    def bulk_create_items():
+
+        user_id, error = acting_user_id(request.args.get("user_id", type=int))
+        if error:
+            return error
+
+        try:
+            rows, parse_errors = parse_rows(request.get_data(as_text=True), request.mimetype)
+        except ImportFormatError as e:
+            return {"errors": [str(e)]}, 400
+
+        max_rows = app.config["BULK_IMPORT_MAX_ROWS"]
+        if len(rows) + len(parse_errors) > max_rows:
+            return {"errors": [f"A bulk import is limited to {max_rows} rows"]}, 400
+
+        created, row_errors = import_items(
+            user_id,
+            rows,
+            batch_size=app.config["BULK_IMPORT_BATCH_SIZE"],
+            row_errors=parse_errors,
+        )
+        bump(user_scope(user_id), TAGS_SCOPE, CREATORS_SCOPE)
+        db.session.commit()
+
+        return {"created": created, "row_errors": row_errors}, 201
     
     
     @app.get("/items")
+    @read_replica
+    @versioned(requested_user_scope, cache=True)
     def list_items():
 
+        if "ids" in request.args:
+            return lookup_items()
+
         user_id = request.args.get("user_id", type=int)
         category_id = request.args.get("category_id", type=int)
 
         if not user_id:
             return {"errors": ["user_id query parameter is required"]}, 400
 
-        query = Item.query.filter_by(user_id=user_id)
+        try:
+            serializer = requested_item_serializer()
+        except FieldsetError as e:
+            return {"errors": [str(e)]}, 400
+
+        query = serializer.query().filter(Item.user_id == user_id)
 
         if category_id:
-            query = query.filter_by(category_id=category_id)
+            query = query.filter(Item.category_id == category_id)
+
+        return list_response(query, Item.title, Item.id, serializer.serialize, many=True)
+    
+    
+    def lookup_items():
+
+        try:
+            item_ids = requested_item_ids()
+            serializer = requested_item_serializer()
+        except ValueError as e:
+            return {"errors": [str(e)]}, 400
 
-        items = query.all()
+        # The response is versioned on user_id's scope when it is given,
+        # so it may only contain that user's items.
+        items, missing = serializer.lookup(item_ids, request.args.get("user_id", type=int))
+        return {"results": items, "missing": missing}, 200
 
-        results = []
-        for item in items:
-            results.append({
-                "id": item.id,
-                "title": item.title,
-                "user_id": item.user_id,
-                "category_id": item.category_id,
-                "category_name": item.category.name if item.category else None,
-                "image_url": item.image_url,
-            })
 
-        return results, 200
+    @app.get("/items/search")
+    @read_replica
+    def search_items():
+
+        user_id = request.args.get("user_id", type=int)
+        if not user_id:
+            return {"errors": ["user_id query parameter is required"]}, 400
+
+        terms = search_terms(request.args.get("q"))
+        if not terms:
+            return {"errors": ["q query parameter must contain a search term"]}, 400
+
+        try:
+            matches, limit, next_cursor = search_item_ids(user_id, terms)
+        except PaginationError as e:
+            return {"errors": [str(e)]}, 400
+
+        items = {item["id"]: item for item in load_item_dicts([item_id for item_id, _ in matches])}
+
+        return {
+            "results": [items[item_id] for item_id, _ in matches],
+            "limit": limit,
+            "next_cursor": next_cursor,
+        }, 200
     
     
     @app.get("/items/<int:item_id>")
+    @read_replica
     def get_item(item_id):
 
-        item = Item.query.get(item_id)
+        try:
+            serializer = requested_item_serializer()
+        except FieldsetError as e:
+            return {"errors": [str(e)]}, 400
 
-        if not item:
+        items = serializer.load([item_id])
+
+        if not items:
             return {"errors": [f"Item with id {item_id} not found"]}, 404
         
-        return {
-            "id": item.id,
-            "title": item.title,
-            "user_id": item.user_id,
-            "category_id": item.category_id,
-            "category_name": item.category.name if item.category else None,
-            "image_url": item.image_url,
-            "tags": [t.name for t in item.tags],
-            "creators": [c.name for c in item.creators],
-        }, 200
+        return items[0], 200
     
     
     @app.patch("/items/<int:item_id>")
@@ -239,36 +526,82 @@ def create_app():
             category = Category.query.get(data["category_id"])
             if not category:
                 return {"errors": ["Category does not exist"]}, 400
-            item.category_id = data["category_id"]
+            if category.id != item.category_id:
+                add_category_count(item.user_id, item.category_id, -1)
+                add_category_count(item.user_id, category.id, 1)
+            item.category_id = category.id
 
         if "image_url" in data:
             item.image_url = data["image_url"]
 
+        bump(user_scope(item.user_id))
         db.session.commit()
 
-        return {
-            "id": item.id,
-            "title": item.title,
-            "user_id": item.user_id,
-            "category_id": item.category_id,
-            "image_url": item.image_url,
-            "tags": [t.name for t in item.tags],
-            "creators": [c.name for c in item.creators],
-        }, 200
+        return load_item_dict(item_id), 200
     
     
     @app.delete("/items/<int:item_id>")
     def delete_item(item_id):
 
-        item = Item.query.get(item_id)
+        # Reviews and tag/creator links go with it via ON DELETE CASCADE,
+        # so their counts are taken off first.
+        add_counts(item_counts(Item.id == item_id, -1))
+        user_id = db.session.scalar(
+            db.delete(Item).where(Item.id == item_id).returning(Item.user_id)
+        )
 
-        if not item:
+        if user_id is None:
             return {"errors": [f"Item with id {item_id} not found"]}, 404
-        
-        db.session.delete(item)
+
+        bump(user_scope(user_id))
         db.session.commit()
 
         return {"message": f"Item {item_id} deleted successfully"}, 200
+
+
+    @app.delete("/items")
+    def delete_items():
+
+        user_id, error = acting_user_id(request.args.get("user_id", type=int))
+        if error:
+            return error
+
+        stmt = db.delete(Item).where(Item.user_id == user_id)
+
+        if "ids" in request.args:
+            try:
+                item_ids = requested_item_ids()
+            except ValueError as e:
+                return {"errors": [str(e)]}, 400
+
+            condition = (Item.user_id == user_id) & Item.id.in_(item_ids)
+            add_counts(item_counts(condition, -1))
+            deleted = set(db.session.scalars(
+                stmt.where(Item.id.in_(item_ids)).returning(Item.id)
+            ))
+            result = {
+                "deleted": len(deleted),
+                "missing": [item_id for item_id in item_ids if item_id not in deleted],
+            }
+        elif "category_id" in request.args:
+            category_id = request.args.get("category_id", type=int)
+            if category_id is None:
+                return {"errors": ["category_id must be an integer"]}, 400
+
+            condition = (Item.user_id == user_id) & (Item.category_id == category_id)
+            add_counts(item_counts(condition, -1))
+            deleted = db.session.execute(
+                stmt.where(Item.category_id == category_id)
+            ).rowcount
+            result = {"deleted": deleted}
+        else:
+            return {"errors": ["ids or category_id query parameter is required"]}, 400
+
+        if result["deleted"]:
+            bump(user_scope(user_id))
+        db.session.commit()
+
+        return result, 200
     
     
     @app.post("/reviews")
@@ -276,24 +609,16 @@ def create_app():
 
         data = request.get_json() or {}
         
-        required = ["user_id", "item_id"]
-        missing = [field for field in required if field not in data]
-        if missing:
-            return {"errors": [f"Missing field: {m}" for m in missing]}, 400        
+        if "item_id" not in data:
+            return {"errors": ["Missing field: item_id"]}, 400
         
-        rating_value = None
-        if "rating" in data and data["rating"] is not None:
-            try:
-                rating_value = int(data["rating"])
-            except (TypeError, ValueError):
-                return {"errors": ["Rating must be an integer between 1 and 5"]}, 400
-
-            if rating_value < 1 or rating_value > 5:
-                return {"errors": ["Rating must be between 1 and 5"]}, 400
+        rating_value, error = parse_rating(data.get("rating"))
+        if error:
+            return {"errors": [error]}, 400
         
-        user = User.query.get(data["user_id"])
-        if not user:
-            return {"errors": ["User does not exist"]}, 400
+        user_id, error = acting_user_id(data.get("user_id"))
+        if error:
+            return error
         
         item = Item.query.get(data["item_id"])
         if not item:
@@ -302,47 +627,99 @@ def create_app():
         review = Review(
             rating=rating_value,
             text=data.get("text"),
-            user_id=user.id,
+            user_id=user_id,
             item_id=item.id,
         )
 
         db.session.add(review)
+        apply_rating_change(item.id, None, rating_value)
+        add_review_counts(item.id, [(rating_value, 1)])
+        bump(user_scope(item.user_id))
         db.session.commit()
 
         return review_to_dict(review), 201
     
     
+    @app.patch("/reviews/<int:review_id>")
+    def update_review(review_id):
+
+        review = Review.query.get(review_id)
+        if not review:
+            return {"errors": [f"Review with id {review_id} not found"]}, 404
+        
+        data = request.get_json() or {}
+
+        if not data:
+            return {"errors": ["No data provided to update"]}, 400
+        
+        if "rating" in data:
+            rating_value, error = parse_rating(data["rating"])
+            if error:
+                return {"errors": [error]}, 400
+            
+            apply_rating_change(review.item_id, review.rating, rating_value)
+            add_review_counts(review.item_id, [(review.rating, -1), (rating_value, 1)])
+            review.rating = rating_value
+
+        if "text" in data:
+            review.text = data["text"]
+
+        bump_item_owners([review.item_id])
+        db.session.commit()
+
+        return review_to_dict(review), 200
+    
+    
+    @app.delete("/reviews/<int:review_id>")
+    def delete_review(review_id):
+
+        review = Review.query.get(review_id)
+        if not review:
+            return {"errors": [f"Review with id {review_id} not found"]}, 404
+        
+        apply_rating_change(review.item_id, review.rating, None)
+        add_review_counts(review.item_id, [(review.rating, -1)])
+        bump_item_owners([review.item_id])
+        db.session.delete(review)
+        db.session.commit()
+
+        return {"message": f"Review {review_id} deleted successfully"}, 200
+    
+    
     @app.get("/reviews")
+    @read_replica
     def list_reviews():
 
-        reviews = Review.query.all()
-        return jsonify([review_to_dict(r) for r in reviews]), 200
+        return list_response(Review.query, Review.id, Review.id, review_to_dict, paged=True)
     
     
     @app.get("/items/<int:item_id>/reviews")
+    @read_replica
     def list_item_reviews(item_id):
 
         item = Item.query.get(item_id)
         if not item:
             return {"errors": [f"Item with id {item_id} not found"]}, 404
         
-        reviews = Review.query.filter_by(item_id=item_id).all()
-        return jsonify([review_to_dict(r) for r in reviews]), 200
+        query = Review.query.filter_by(item_id=item_id)
+        return list_response(query, Review.id, Review.id, review_to_dict, paged=True)
     
     
     @app.get("/tags")
+    @read_replica
+    @versioned(lambda: TAGS_SCOPE)
     def list_tags():
 
-        tags = Tag.query.all()
-
-        results = []
-        for tag in tags:
-            results.append({
-                "id": tag.id,
-                "name": tag.name,
-            })
+        prefix = request.args.get("prefix")
+        if prefix:
+            try:
+                limit = limit_arg(PREFIX_LIMIT, MAX_PREFIX_LIMIT)
+            except PaginationError as e:
+                return {"errors": [str(e)]}, 400
+            tags = prefix_matches(Tag, prefix, limit)
+            return jsonify([tag_to_dict(t) for t in tags]), 200
 
-        return jsonify(results), 200
+        return list_response(Tag.query, Tag.name, Tag.id, tag_to_dict)
     
     
     @app.post("/tags")
@@ -354,15 +731,18 @@ def create_app():
         if not name:
             return {"errors": ["Tag name is required"]}, 400
     
-        existing = Tag.query.filter_by(name=name).first()
-        if existing:
-            return {"errors": ["Tag with this name already exists"]}, 400
-    
         tag = Tag(name=name)
         db.session.add(tag)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return {"errors": ["Tag with this name already exists"]}, 400
+    
+        bump(TAGS_SCOPE)
         db.session.commit()
 
-        return {"id": tag.id, "name": tag.name}, 201
+        return tag_to_dict(tag), 201
     
     
     @app.post("/items/<int:item_id>/tags")
@@ -373,44 +753,78 @@ def create_app():
             return {"errors": [f"Item with id {item_id} not found"]},404
         
         data = request.get_json() or {}
-        tag_ids = data.get("tag_ids")
+        tag_ids = id_list(data.get("tag_ids"))
 
-        if tag_ids is None or not isinstance(tag_ids, list):
+        if tag_ids is None:
             return {"errors": ["tag_ids must be a list"]}, 400
         
-        tags = Tag.query.filter(Tag.id.in_(tag_ids)).all()
-
-        if len(tags) != len(tag_ids):
+        if missing_ids(Tag, tag_ids):
             return {"errors": ["One or more tag_ids do not exist"]}, 400
         
-        item.tags = tags
+        replace_links(ItemTag.tag_id, item_id, tag_ids)
+        bump(user_scope(item.user_id))
         db.session.commit()
 
-        return {
-            "id": item.id,
-            "title": item.title,
-            "user_id": item.user_id,
-            "category_id": item.category_id,
-            "category_name": item.category.name if item.category else None,
-            "image_url": item.image_url,
-            "tags": [t.name for t in item.tags],
-            "creators": [c.name for c in item.creators],
-        }, 200
+        return load_item_dict(item_id), 200
+    
+    
+    @app.patch("/items/<int:item_id>/tags")
+    def update_item_tags(item_id):
+
+        item = Item.query.get(item_id)
+        if not item:
+            return {"errors": [f"Item with id {item_id} not found"]}, 404
+        
+        add, remove, errors = link_changes(request.get_json() or {}, Tag, "tag_ids")
+        if errors:
+            return {"errors": errors}, 400
+        
+        remove_links(ItemTag.tag_id, [item_id], remove)
+        add_links(ItemTag.tag_id, [item_id], add)
+        bump(user_scope(item.user_id))
+        db.session.commit()
+
+        return load_item_dict(item_id), 200
+    
+    
+    @app.patch("/items/tags")
+    def update_many_item_tags():
+
+        data = request.get_json() or {}
+        item_ids = id_list(data.get("item_ids"))
+
+        if not item_ids:
+            return {"errors": ["item_ids must be a non-empty list"]}, 400
+        if missing_ids(Item, item_ids):
+            return {"errors": ["One or more item_ids do not exist"]}, 400
+        
+        add, remove, errors = link_changes(data, Tag, "tag_ids")
+        if errors:
+            return {"errors": errors}, 400
+        
+        remove_links(ItemTag.tag_id, item_ids, remove)
+        add_links(ItemTag.tag_id, item_ids, add)
+        bump_item_owners(item_ids)
+        db.session.commit()
+
+        return jsonify(load_item_dicts(item_ids)), 200
     
     
     @app.get("/creators")
+    @read_replica
+    @versioned(lambda: CREATORS_SCOPE)
     def list_creators():
 
-        creators = Creator.query.all()
-
-        results = []
-        for creator in creators:
-            results.append({
-                "id": creator.id,
-                "name": creator.name,
-            })
+        prefix = request.args.get("prefix")
+        if prefix:
+            try:
+                limit = limit_arg(PREFIX_LIMIT, MAX_PREFIX_LIMIT)
+            except PaginationError as e:
+                return {"errors": [str(e)]}, 400
+            creators = prefix_matches(Creator, prefix, limit)
+            return jsonify([creator_to_dict(c) for c in creators]), 200
 
-        return jsonify(results), 200
+        return list_response(Creator.query, Creator.name, Creator.id, creator_to_dict)
     
     
     @app.post("/creators")
@@ -422,15 +836,18 @@ def create_app():
         if not name:
             return {"errors": ["Creator name is required"]}, 400
         
-        existing = Creator.query.filter_by(name=name).first()
-        if existing:
-            return {"errors": ["Creator with this name already exists"]}, 400
-        
         creator = Creator(name=name)
         db.session.add(creator)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return {"errors": ["Creator with this name already exists"]}, 400
+        
+        bump(CREATORS_SCOPE)
         db.session.commit()
 
-        return {"id": creator.id, "name": creator.name}, 201
+        return creator_to_dict(creator), 201
     
     
     @app.post("/items/<int:item_id>/creators")
@@ -441,31 +858,67 @@ def create_app():
             return {"errors": [f"Item with id {item_id} not found"]}, 404
         
         data = request.get_json() or {}
-        creator_ids = data.get("creator_ids")
+        creator_ids = id_list(data.get("creator_ids"))
 
-        if creator_ids is None or not isinstance(creator_ids, list):
+        if creator_ids is None:
             return {"errors": ["creator_ids must be a list"]}, 400
         
-        creators = Creator.query.filter(Creator.id.in_(creator_ids)).all()
-
-        if len(creators) != len(creator_ids):
+        if missing_ids(Creator, creator_ids):
             return {"errors": ["One or more creator_ids do not exist"]}, 400
         
-        item.creators = creators
+        replace_links(ItemCreator.creator_id, item_id, creator_ids)
+        bump(user_scope(item.user_id))
         db.session.commit()
 
-        return {
-            "id": item.id,
-            "title": item.title,
-            "user_id": item.user_id,
-            "category_id": item.category_id,
-            "category_name": item.category.name if item.category else None,
-            "image_url": item.image_url,
-            "tags": [t.name for t in item.tags],
-            "creators": [c.name for c in item.creators],
-        }, 200
+        return load_item_dict(item_id), 200
+    
+    
+    @app.patch("/items/<int:item_id>/creators")
+    def update_item_creators(item_id):
+
+        item = Item.query.get(item_id)
+        if not item:
+            return {"errors": [f"Item with id {item_id} not found"]}, 404
+        
+        add, remove, errors = link_changes(
+            request.get_json() or {}, Creator, "creator_ids"
+        )
+        if errors:
+            return {"errors": errors}, 400
+        
+        remove_links(ItemCreator.creator_id, [item_id], remove)
+        add_links(ItemCreator.creator_id, [item_id], add)
+        bump(user_scope(item.user_id))
+        db.session.commit()
+
+        return load_item_dict(item_id), 200
+    
+    
+    @app.patch("/items/creators")
+    def update_many_item_creators():
+
+        data = request.get_json() or {}
+        item_ids = id_list(data.get("item_ids"))
+
+        if not item_ids:
+            return {"errors": ["item_ids must be a non-empty list"]}, 400
+        if missing_ids(Item, item_ids):
+            return {"errors": ["One or more item_ids do not exist"]}, 400
+        
+        add, remove, errors = link_changes(data, Creator, "creator_ids")
+        if errors:
+            return {"errors": errors}, 400
+        
+        remove_links(ItemCreator.creator_id, item_ids, remove)
+        add_links(ItemCreator.creator_id, item_ids, add)
+        bump_item_owners(item_ids)
+        db.session.commit()
+
+        return jsonify(load_item_dicts(item_ids)), 200
       
     @app.get("/categories")
+    @read_replica
+    @versioned(requested_user_scope, cache=True)
     def list_categories():
         user_id = request.args.get("user_id", type=int)
         if not user_id:
@@ -473,10 +926,7 @@ def create_app():
 
         categories = Category.query.filter_by(user_id=user_id).order_by(Category.name).all()
 
-        return [
-            {"id": c.id, "name": c.name, "user_id": c.user_id}
-            for c in categories
-        ], 200
+        return [category_to_dict(c) for c in categories], 200
     
     @app.post("/categories")
     def create_category():
@@ -489,47 +939,29 @@ def create_app():
 
         existing = Category.query.filter_by(name=name, user_id=user_id).first()
         if existing:
-            return {
-                "id": existing.id,
-                "name": existing.name,
-                "user_id": existing.user_id,
-            }, 200
+            return category_to_dict(existing), 200
 
         category = Category(name=name, user_id=user_id)
         db.session.add(category)
+        bump(user_scope(user_id))
         db.session.commit()
 
-        return {
-            "id": category.id,
-            "name": category.name,
-            "user_id": category.user_id,
-        }, 201
+        return category_to_dict(category), 201
     
     @app.get("/export/items")
+    @read_replica
     def export_items():
         user_id = request.args.get("user_id", type=int)
         if not user_id:
             return {"errors": ["user_id query parameter is required"]}, 400
 
-        items = Item.query.filter_by(user_id=user_id).all()
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        writer.writerow(["id", "title", "category_id", "image_url"])
-
-        for item in items:
-            writer.writerow([
-                item.id,
-                item.title,
-                item.category_id,
-                item.image_url or "",
-            ])
-
-        csv_data = output.getvalue()
+        chunks = iter_items_csv(
+            export_query(user_id),
+            chunk_size=app.config["EXPORT_CHUNK_SIZE"],
+        )
 
         response = app.response_class(
-            csv_data,
+            stream_with_context(chunks),
             mimetype="text/csv",
             headers={
                 "Content-Disposition": (
@@ -542,88 +974,66 @@ def create_app():
     @app.post("/export/items/email")
     def email_items_export():
         data = request.get_json() or {}
-        user_id = data.get("user_id")
-
-        if not user_id:
-            return {"errors": ["user_id is required"]}, 400
-
-        user = User.query.get(user_id)
-        if not user or not user.email:
-            return {"errors": ["User with email not found"]}, 400
-
-        items = Item.query.filter_by(user_id=user_id).all()
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["id", "title", "category_id", "image_url"])
-        for item in items:
-            writer.writerow([
-                item.id,
-                item.title,
-                item.category_id,
-                item.image_url or "",
-            ])
-
-        csv_data = output.getvalue()
-
-        app_obj = current_app._get_current_object()
+        token = g.get("token")
+
+        if token:
+            user_id, error = acting_user_id(data.get("user_id"))
+            if error:
+                return error
+            email = token["email"]
+            if not email:
+                return {"errors": ["User with email not found"]}, 400
+        else:
+            user_id = data.get("user_id")
+            if not user_id:
+                return {"errors": ["user_id is required"]}, 400
+
+            user = User.query.get(user_id)
+            if not user or not user.email:
+                return {"errors": ["User with email not found"]}, 400
+            email = user.email
+
+        job = ExportJob(user_id=user_id, email=email)
+        db.session.add(job)
+        db.session.commit()
 
-        threading.Thread(
-            target=send_export_email,
-            args=(app_obj, user.email, csv_data),
-            daemon=True,
-        ).start()
+        try:
+            app.extensions["export_jobs"].submit(job.id)
+        except queue.Full:
+            db.session.delete(job)
+            db.session.commit()
+            return {"errors": ["Too many exports in progress, please try again shortly"]}, 503
 
         return {
-            "message": f"Export job created. A CSV will be sent to {user.email}."
-        }, 200
-    
-    def send_export_email(app, to_email, csv_data):
-        with app.app_context():
-            api_token = app.config.get("MAILTRAP_API_TOKEN")
-            inbox_id = app.config.get("MAILTRAP_INBOX_ID")
-
-            if not api_token or not inbox_id:
-                app.logger.error(
-                    "Mailtrap API token or inbox ID missing. "
-                    "MAILTRAP_API_TOKEN=%r, MAILTRAP_INBOX_ID=%r",
-                    bool(api_token),
-                    bool(inbox_id),
-                )
-                return
-
-            client = mt.MailtrapClient(
-                token=api_token,
-                sandbox=True,
-                inbox_id=inbox_id,
-            )
-
-            csv_bytes = csv_data.encode("utf-8")
-            csv_b64 = base64.b64encode(csv_bytes)
-
-            mail = mt.Mail(
-                sender=mt.Address(
-                    email="no-reply@medialog.test",
-                    name="MediaLog",
-                ),
-                to=[mt.Address(email=to_email)],
-                subject="Your MediaLog Export",
-                text="Your MediaLog CSV export is attached.",
-                attachments=[
-                    mt.Attachment(
-                        content=csv_b64,
-                        filename="medialog-export.csv",
-                        disposition=mt.Disposition.ATTACHMENT,
-                        mimetype="text/csv",
-                    )
-                ],
-            )
-
-            try:
-                client.send(mail)
-                app.logger.info("Export email sent to %s via Mailtrap API", to_email)
-            except Exception as e:
-                app.logger.error("Failed to send export email via Mailtrap: %r", e)
+            "message": f"Export job created. A CSV will be sent to {email}.",
+            "job_id": job.id,
+        }, 202
+
+    @app.get("/export/jobs/<int:job_id>")
+    def get_export_job(job_id):
+        job = ExportJob.query.get(job_id)
+        if not job:
+            return {"errors": [f"Export job with id {job_id} not found"]}, 404
+
+        return export_job_to_dict(job), 200
+
+    @app.get("/cache/stats")
+    def cache_stats():
+        read_cache = app.extensions["read_cache"]
+        if read_cache is None:
+            return {"enabled": False}, 200
+
+        return {"enabled": True, **read_cache.stats()}, 200
+
+    @app.get("/metrics")
+    def metrics_view():
+        if metrics is None:
+            return {"errors": ["Metrics are disabled"]}, 404
+
+        return app.response_class(
+            metrics.render(),
+            mimetype="text/plain; version=0.0.4",
+        )
 
     @app.get("/smtp-debug")
     def smtp_debug():
@@ -638,25 +1048,13 @@ def create_app():
     @app.get("/smtp-test")
     def smtp_test():
         try:
-            import smtplib
-            from email.message import EmailMessage
-
             msg = EmailMessage()
             msg["Subject"] = "MediaLog SMTP Test"
             msg["From"] = app.config.get("MAIL_FROM")
             msg["To"] = "test@example.com"
             msg.set_content("If you see this in Mailtrap, SMTP is working.")
 
-            with smtplib.SMTP(
-                app.config.get("MAIL_SERVER"),
-                app.config.get("MAIL_PORT"),
-            ) as smtp:
-                smtp.starttls()
-                smtp.login(
-                    app.config.get("MAIL_USERNAME"),
-                    app.config.get("MAIL_PASSWORD"),
-                )
-                smtp.send_message(msg)
+            app.extensions["smtp"].send_messages([msg])
 
             return {"ok": True, "message": "SMTP test sent"}, 200
 
@@ -0,0 +1,68 @@
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import db
+from .stats import add_counts, link_counts
+
+
+def insert_ignoring_conflicts(model, rows):
+    """Insert association rows, skipping ones that already exist."""
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model).on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model).on_conflict_do_nothing()
+    else:
+        keys = list(rows[0])
+        existing = set(db.session.execute(
+            select(*(getattr(model, k) for k in keys)).where(
+                model.item_id.in_({r["item_id"] for r in rows})
+            )
+        ).all())
+        rows = [r for r in rows if tuple(r[k] for k in keys) not in existing]
+        if not rows:
+            return
+        stmt = insert(model)
+
+    db.session.execute(stmt, rows)
+
+
+def add_links(column, item_ids, ids):
+    """Link every item in ``item_ids`` to every id in ``ids``, where
+    ``column`` is the association's foreign key, e.g. ``ItemTag.tag_id``."""
+    if not item_ids or not ids:
+        return
+
+    add_counts(link_counts(column, item_ids, ids, 1))
+    insert_ignoring_conflicts(column.class_, [
+        {"item_id": item_id, column.key: linked_id}
+        for item_id in item_ids
+        for linked_id in ids
+    ])
+
+
+def remove_links(column, item_ids, ids):
+    if not item_ids or not ids:
+        return
+
+    add_counts(link_counts(column, item_ids, ids, -1))
+    model = column.class_
+    db.session.execute(
+        delete(model).where(model.item_id.in_(item_ids), column.in_(ids))
+    )
+
+
+def replace_links(column, item_id, ids):
+    """Make ``ids`` the full link set of one item, writing only the
+    association rows that actually change."""
+    model = column.class_
+    current = set(db.session.scalars(
+        select(column).where(model.item_id == item_id)
+    ))
+    wanted = set(ids)
+
+    remove_links(column, [item_id], current - wanted)
+    add_links(column, [item_id], wanted - current)
@@ -0,0 +1,114 @@
+import time
+import uuid
+import secrets
+import threading
+
+from flask import current_app, g, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+TOKEN_SALT = "medialog-session"
+
+
+class TokenError(ValueError):
+    pass
+
+
+class TokenDenylist:
+    """Revoked token ids, kept only until the token would expire anyway.
+
+    Lives in process memory, so each worker keeps its own list.
+    """
+
+    def __init__(self):
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._purge()
+            self._expires[jti] = expires_at
+
+    def __contains__(self, jti):
+        with self._lock:
+            return jti in self._expires
+
+    def __len__(self):
+        with self._lock:
+            self._purge()
+            return len(self._expires)
+
+    def _purge(self):
+        now = time.time()
+        for jti in [j for j, exp in self._expires.items() if exp < now]:
+            del self._expires[jti]
+
+
+def secret_key(app):
+    """``SECRET_KEY``, which must be set outside debug and testing: every
+    worker has to sign and check tokens with the same key. Debug and test
+    apps without one get a random key for this process."""
+    key = app.config.get("SECRET_KEY")
+    if key:
+        return key
+    if not (app.debug or app.testing):
+        raise RuntimeError("SECRET_KEY must be set to sign session tokens")
+
+    app.logger.warning("SECRET_KEY is not set; using a random key for this process")
+    key = app.config["SECRET_KEY"] = secrets.token_hex(32)
+    return key
+
+
+class SessionTokens:
+    """Issues and checks signed, expiring session tokens.
+
+    A token carries the user's id and email, so a request that presents
+    one can act as that user without loading the ``User`` row.
+    """
+
+    def __init__(self, app):
+        self.ttl = app.config["SESSION_TOKEN_TTL"]
+        self.serializer = URLSafeTimedSerializer(secret_key(app), salt=TOKEN_SALT)
+        self.denylist = TokenDenylist()
+
+    def issue(self, user):
+        return self.serializer.dumps({
+            "uid": user.id,
+            "email": user.email,
+            "jti": uuid.uuid4().hex,
+        })
+
+    def load(self, token):
+        try:
+            claims, issued_at = self.serializer.loads(
+                token, max_age=self.ttl, return_timestamp=True
+            )
+        except SignatureExpired:
+            raise TokenError("Session token has expired")
+        except BadSignature:
+            raise TokenError("Invalid session token")
+
+        if claims["jti"] in self.denylist:
+            raise TokenError("Session token has been revoked")
+
+        claims["exp"] = issued_at.timestamp() + self.ttl
+        return claims
+
+    def revoke(self, claims):
+        self.denylist.add(claims["jti"], claims["exp"])
+
+
+def authenticate_request():
+    """``before_request`` hook: put a valid bearer token's claims on
+    ``g.token``. Requests without one carry on unauthenticated."""
+    g.token = None
+
+    header = request.headers.get("Authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+
+    try:
+        g.token = current_app.extensions["session_tokens"].load(token.strip())
+    except TokenError as e:
+        return {"errors": [str(e)]}, 401
+    return None
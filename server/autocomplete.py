@@ -0,0 +1,31 @@
+from sqlalchemy import and_, func
+
+from .models import db
+
+PREFIX_LIMIT = 10
+MAX_PREFIX_LIMIT = 50
+
+
+def prefix_matches(model, prefix, limit):
+    """Names of ``model`` starting with ``prefix``, case-insensitively.
+
+    Served by the ``lower(name)`` index in index order, so the scan stops
+    after ``limit`` rows however many names share the prefix. Ranking is
+    exact match first, then alphabetical.
+    """
+    prefix = prefix.lower()
+
+    if db.session.get_bind().dialect.name == "postgresql":
+        # Under "C" collation LIKE 'abc%' becomes an index range scan.
+        key = func.lower(model.name.collate("C"))
+        condition = key.startswith(prefix, autoescape=True)
+    else:
+        key = func.lower(model.name)
+        condition = and_(key >= prefix, key < prefix + "\U0010ffff")
+
+    return (
+        model.query.filter(condition)
+        .order_by(key, model.id)
+        .limit(limit)
+        .all()
+    )
@@ -0,0 +1,517 @@
+"""Benchmark every API route against seeded databases of several sizes.
+
+    python -m server.bench --sizes 1000 100000 1000000 --output bench.json
+    python -m server.bench --database-url postgresql+psycopg2://localhost/medialog_bench
+
+Each size rebuilds the schema and seeds users of ``--items-per-user``
+items with ``seed.generate``, so per-user lists stay the same length while the tables grow.
+Every case records p50/p99 latency, peak traced allocation, SQL
+statement count and response body size. A case whose statement count
+exceeds its entry in ``QUERY_BUDGETS`` fails the run, as does a route
+with no case. Pass ``--accept-encoding gzip`` (or ``br``) to compare
+body size and latency with compression on.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import tempfile
+import threading
+import tracemalloc
+
+from sqlalchemy import event, select
+
+from .app import create_app
+from .seed import FIRST_NAMES, TAG_WORDS, TITLE_WORDS, generate
+from .models import (
+    db,
+    User,
+    Category,
+    Item,
+    Tag,
+    Creator,
+    Review,
+    ExportJob,
+)
+
+# Routes that are deliberately not benchmarked.
+SKIPPED_ROUTES = {
+    "GET /smtp-test": "sends real mail",
+}
+
+# Highest SQL statement count each case may issue. Counts must not grow
+# with table size; a rise here is usually an N+1. Full-list cases fetch
+# tag and creator names in chunks of ids, so they are set for the
+# default 1000 items per user.
+QUERY_BUDGETS = {
+    "GET /": 0,
+    "POST /users": 4,
+    "GET /users": 1,
+    "GET /users/<id>": 1,
+    "GET /users/<id>/stats": 1,
+    "GET /users/<id>/stats after a write": 2,
+    "POST /login": 1,
+    "POST /logout": 0,
+    "POST /items": 8,
+    "POST /items/bulk": 17,
+    "GET /items": 6,
+    "GET /items?limit=50": 4,
+    "GET /items?fields=id,title": 2,
+    "GET /items?include=reviews&limit=50": 5,
+    "GET /items?ids= (50 ids)": 3,
+    "GET /items/search": 4,
+    "GET /items/<id>": 3,
+    "GET /items/<id>?include=reviews,category": 4,
+    "PATCH /items/<id>": 6,
+    "DELETE /items/<id>": 3,
+    "DELETE /items?ids= (20 ids)": 3,
+    "DELETE /items?category_id= (20 items)": 3,
+    "POST /reviews": 6,
+    "PATCH /reviews/<id>": 7,
+    "DELETE /reviews/<id>": 6,
+    "GET /reviews?limit=50": 1,
+    "GET /items/<id>/reviews": 2,
+    "GET /tags": 2,
+    "GET /tags?prefix=": 2,
+    "POST /tags": 3,
+    "POST /items/<id>/tags": 11,
+    "PATCH /items/<id>/tags": 10,
+    "PATCH /items/tags": 11,
+    "GET /creators": 2,
+    "GET /creators?prefix=": 2,
+    "POST /creators": 3,
+    "POST /items/<id>/creators": 11,
+    "PATCH /items/<id>/creators": 10,
+    "PATCH /items/creators": 11,
+    "GET /categories": 2,
+    "POST /categories": 4,
+    "GET /export/items": 6,
+    "POST /export/items/email": 2,
+    "GET /export/jobs/<id>": 1,
+    "GET /cache/stats": 0,
+    "GET /metrics": 0,
+    "GET /smtp-debug": 0,
+}
+
+
+def bench_context(client):
+    """Ids and credentials the cases use, all owned by the first user."""
+    user = User.query.order_by(User.id).first()
+    token = client.post(
+        "/login", json={"email": user.email, "password": user.password}
+    ).json["token"]
+
+    job = ExportJob(user_id=user.id, email=user.email, status="sent")
+    db.session.add(job)
+    db.session.commit()
+
+    return {
+        "user_id": user.id,
+        "email": user.email,
+        "headers": {"Authorization": f"Bearer {token}"},
+        "category_id": db.session.scalar(
+            select(Category.id).filter_by(user_id=user.id).order_by(Category.id)
+        ),
+        "item_ids": db.session.scalars(
+            select(Item.id).filter_by(user_id=user.id).order_by(Item.id).limit(100)
+        ).all(),
+        "tag_ids": db.session.scalars(select(Tag.id).order_by(Tag.id).limit(10)).all(),
+        "creator_ids": db.session.scalars(select(Creator.id).order_by(Creator.id).limit(10)).all(),
+        "review_id": db.session.scalar(
+            select(Review.id).filter_by(user_id=user.id).order_by(Review.id)
+        ),
+        "job_id": job.id,
+    }
+
+
+def build_cases(client, ctx):
+    """Return ``(name, rule, make_request)`` triples.
+
+    ``make_request(n)`` runs outside the timed section, so it may do
+    setup through the client, and returns ``(method, path, kwargs)``.
+    """
+    uid = ctx["user_id"]
+    auth = ctx["headers"]
+    items = ctx["item_ids"]
+    tags = ctx["tag_ids"]
+    creators = ctx["creator_ids"]
+    run = time.monotonic_ns()
+
+    def item(n):
+        return items[n % len(items)]
+
+    def new_item(n):
+        return client.post(
+            "/items",
+            json={"title": f"Scratch {n}", "category_id": ctx["category_id"]},
+            headers=auth,
+        ).json["id"]
+
+    def new_category_with_items(n, count=20):
+        category_id = client.post(
+            "/categories", json={"name": f"Scratch {run} {n}", "user_id": uid}, headers=auth
+        ).json["id"]
+        for i in range(count):
+            client.post(
+                "/items",
+                json={"title": f"Scratch {n}.{i}", "category_id": category_id},
+                headers=auth,
+            )
+        return category_id
+
+    def new_review(n):
+        return client.post(
+            "/reviews", json={"item_id": item(n), "rating": 3}, headers=auth
+        ).json["id"]
+
+    def stats_after_write(n):
+        # Changes the stored counts and bumps the user's version, so the
+        # timed read misses the memo.
+        new_review(n)
+        return "GET", f"/users/{uid}/stats", {}
+
+    def fresh_token(n):
+        return client.post(
+            "/login", json={"email": ctx["email"], "password": "password"}
+        ).json["token"]
+
+    def bulk_csv(n):
+        return "title,category_name,tags\n" + "".join(
+            f"Bulk {n}-{r},Book,tag 1; tag 2\n" for r in range(10)
+        )
+
+    return [
+        ("GET /", "/", lambda n: ("GET", "/", {})),
+        ("POST /users", "/users", lambda n: ("POST", "/users", {"json": {
+            "username": f"new{run}-{n}", "first_name": "New", "last_name": "User",
+            "email": f"new{run}-{n}@example.com", "password": "password",
+        }})),
+        ("GET /users", "/users", lambda n: ("GET", "/users", {})),
+        ("GET /users/<id>", "/users/<int:user_id>", lambda n: ("GET", f"/users/{uid}", {})),
+        ("GET /users/<id>/stats", "/users/<int:user_id>/stats", lambda n: (
+            "GET", f"/users/{uid}/stats", {},
+        )),
+        ("GET /users/<id>/stats after a write", "/users/<int:user_id>/stats", stats_after_write),
+        ("POST /login", "/login", lambda n: ("POST", "/login", {
+            "json": {"email": ctx["email"], "password": "password"},
+        })),
+        ("POST /logout", "/logout", lambda n: ("POST", "/logout", {
+            "headers": {"Authorization": f"Bearer {fresh_token(n)}"},
+        })),
+        # Before the item writes, so it streams the seeded items and its
+        # count doesn't depend on how many rows earlier cases added.
+        ("GET /export/items", "/export/items", lambda n: ("GET", f"/export/items?user_id={uid}", {})),
+        ("POST /items", "/items", lambda n: ("POST", "/items", {
+            "json": {"title": f"Bench {n}", "category_id": ctx["category_id"]},
+            "headers": auth,
+        })),
+        ("POST /items/bulk", "/items/bulk", lambda n: ("POST", "/items/bulk", {
+            "data": bulk_csv(n), "content_type": "text/csv", "headers": auth,
+        })),
+        ("GET /items", "/items", lambda n: ("GET", f"/items?user_id={uid}", {})),
+        ("GET /items?limit=50", "/items", lambda n: (
+            "GET", f"/items?user_id={uid}&limit=50", {},
+        )),
+        ("GET /items?fields=id,title", "/items", lambda n: (
+            "GET", f"/items?user_id={uid}&fields=id,title", {},
+        )),
+        ("GET /items?include=reviews&limit=50", "/items", lambda n: (
+            "GET", f"/items?user_id={uid}&include=reviews&limit=50", {},
+        )),
+        ("GET /items?ids= (50 ids)", "/items", lambda n: (
+            "GET", "/items?ids=" + ",".join(str(item(n + i)) for i in range(50)), {},
+        )),
+        ("GET /items/search", "/items/search", lambda n: (
+            "GET", f"/items/search?user_id={uid}&q={TITLE_WORDS[n % len(TITLE_WORDS)]}", {},
+        )),
+        ("GET /items/<id>", "/items/<int:item_id>", lambda n: ("GET", f"/items/{item(n)}", {})),
+        ("GET /items/<id>?include=reviews,category", "/items/<int:item_id>", lambda n: (
+            "GET", f"/items/{item(n)}?include=reviews,category", {},
+        )),
+        ("PATCH /items/<id>", "/items/<int:item_id>", lambda n: ("PATCH", f"/items/{item(n)}", {
+            "json": {"title": f"Renamed {n}"},
+        })),
+        ("DELETE /items/<id>", "/items/<int:item_id>", lambda n: (
+            "DELETE", f"/items/{new_item(n)}", {},
+        )),
+        ("DELETE /items?ids= (20 ids)", "/items", lambda n: (
+            "DELETE", "/items?ids=" + ",".join(str(new_item(f"{n}.{i}")) for i in range(20)),
+            {"headers": auth},
+        )),
+        ("DELETE /items?category_id= (20 items)", "/items", lambda n: (
+            "DELETE", f"/items?category_id={new_category_with_items(n)}", {"headers": auth},
+        )),
+        ("POST /reviews", "/reviews", lambda n: ("POST", "/reviews", {
+            "json": {"item_id": item(n), "rating": 4, "text": "Bench"},
+            "headers": auth,
+        })),
+        ("PATCH /reviews/<id>", "/reviews/<int:review_id>", lambda n: (
+            "PATCH", f"/reviews/{ctx['review_id']}", {"json": {"rating": n % 5 + 1}},
+        )),
+        ("DELETE /reviews/<id>", "/reviews/<int:review_id>", lambda n: (
+            "DELETE", f"/reviews/{new_review(n)}", {},
+        )),
+        ("GET /reviews?limit=50", "/reviews", lambda n: ("GET", "/reviews?limit=50", {})),
+        ("GET /items/<id>/reviews", "/items/<int:item_id>/reviews", lambda n: (
+            "GET", f"/items/{item(n)}/reviews", {},
+        )),
+        ("GET /tags", "/tags", lambda n: ("GET", "/tags", {})),
+        ("GET /tags?prefix=", "/tags", lambda n: (
+            "GET", f"/tags?prefix={TAG_WORDS[n % len(TAG_WORDS)][:3]}", {},
+        )),
+        ("POST /tags", "/tags", lambda n: ("POST", "/tags", {"json": {"name": f"new tag {run}-{n}"}})),
+        ("POST /items/<id>/tags", "/items/<int:item_id>/tags", lambda n: (
+            "POST", f"/items/{item(n)}/tags", {"json": {"tag_ids": tags[n % 3:n % 3 + 3]}},
+        )),
+        ("PATCH /items/<id>/tags", "/items/<int:item_id>/tags", lambda n: (
+            "PATCH", f"/items/{item(n)}/tags", {"json": {"add": tags[:2], "remove": tags[2:4]}},
+        )),
+        ("PATCH /items/tags", "/items/tags", lambda n: ("PATCH", "/items/tags", {
+            "json": {"item_ids": items[:20], "add": tags[4:6], "remove": tags[6:8]},
+        })),
+        ("GET /creators", "/creators", lambda n: ("GET", "/creators", {})),
+        ("GET /creators?prefix=", "/creators", lambda n: (
+            "GET", f"/creators?prefix={FIRST_NAMES[n % len(FIRST_NAMES)][:3]}", {},
+        )),
+        ("POST /creators", "/creators", lambda n: (
+            "POST", "/creators", {"json": {"name": f"new creator {run}-{n}"}},
+        )),
+        ("POST /items/<id>/creators", "/items/<int:item_id>/creators", lambda n: (
+            "POST", f"/items/{item(n)}/creators", {"json": {"creator_ids": creators[n % 3:n % 3 + 2]}},
+        )),
+        ("PATCH /items/<id>/creators", "/items/<int:item_id>/creators", lambda n: (
+            "PATCH", f"/items/{item(n)}/creators", {"json": {"add": creators[:2], "remove": creators[2:4]}},
+        )),
+        ("PATCH /items/creators", "/items/creators", lambda n: ("PATCH", "/items/creators", {
+            "json": {"item_ids": items[:20], "add": creators[4:6], "remove": creators[6:8]},
+        })),
+        ("GET /categories", "/categories", lambda n: ("GET", f"/categories?user_id={uid}", {})),
+        ("POST /categories", "/categories", lambda n: ("POST", "/categories", {
+            "json": {"name": f"Shelf {run}-{n}", "user_id": uid},
+        })),
+        ("GET /export/jobs/<id>", "/export/jobs/<int:job_id>", lambda n: (
+            "GET", f"/export/jobs/{ctx['job_id']}", {},
+        )),
+        ("GET /cache/stats", "/cache/stats", lambda n: ("GET", "/cache/stats", {})),
+        ("GET /metrics", "/metrics", lambda n: ("GET", "/metrics", {})),
+        ("GET /smtp-debug", "/smtp-debug", lambda n: ("GET", "/smtp-debug", {})),
+        # Last, so its background workers don't compete with other cases.
+        ("POST /export/items/email", "/export/items/email", lambda n: (
+            "POST", "/export/items/email", {"json": {}, "headers": auth},
+        )),
+    ]
+
+
+def uncovered_routes(app, cases):
+    covered = {(name.split()[0], rule) for name, rule, _ in cases}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == "static":
+            continue
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            key = f"{method} {rule.rule}"
+            if (method, rule.rule) not in covered and key not in SKIPPED_ROUTES:
+                missing.append(key)
+    return missing
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(len(ordered) * fraction) - 1)]
+
+
+class QueryCounter:
+    """Counts statements run by the benchmarking thread only, so export
+    worker threads don't skew the numbers."""
+
+    def __init__(self, engine):
+        self.count = 0
+        self.enabled = False
+        self.thread_id = threading.get_ident()
+        event.listen(engine, "before_cursor_execute", self.on_execute)
+
+    def on_execute(self, *args, **kwargs):
+        if self.enabled and threading.get_ident() == self.thread_id:
+            self.count += 1
+
+    def measure(self, fn):
+        self.count = 0
+        self.enabled = True
+        try:
+            fn()
+        finally:
+            self.enabled = False
+        return self.count
+
+
+def run_case(client, counter, name, make_request, iterations, warmup):
+    def call(n):
+        method, path, kwargs = make_request(n)
+        holder = {}
+
+        def send():
+            response = client.open(path, method=method, **kwargs)
+            holder["bytes"] = len(response.get_data())
+            response.close()
+            holder["status"] = response.status_code
+
+        return send, holder
+
+    for n in range(warmup):
+        call(n)[0]()
+
+    timings = []
+    queries = 0
+    statuses = set()
+    body_bytes = 0
+    for n in range(warmup, warmup + iterations):
+        send, holder = call(n)
+        started = time.perf_counter()
+        queries = max(queries, counter.measure(send))
+        timings.append((time.perf_counter() - started) * 1000)
+        statuses.add(holder["status"])
+        body_bytes = max(body_bytes, holder["bytes"])
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for n in range(warmup + iterations, warmup + iterations + 3):
+            send, _ = call(n)
+            tracemalloc.reset_peak()
+            send()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+
+    budget = QUERY_BUDGETS.get(name)
+    return {
+        "name": name,
+        "statuses": sorted(statuses),
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p99_ms": round(percentile(timings, 0.99), 3),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "peak_alloc_kb": round(peak / 1024, 1),
+        "body_bytes": body_bytes,
+        "queries": queries,
+        "query_budget": budget,
+        "over_budget": budget is None or queries > budget,
+    }
+
+
+def bench_size(app, n_items, args):
+    client = app.test_client()
+    if args.accept_encoding:
+        client.environ_base["HTTP_ACCEPT_ENCODING"] = args.accept_encoding
+
+    # Export jobs queued by the previous size must finish before their
+    # rows are dropped from under them.
+    app.extensions["export_jobs"].queue.join()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # drop_all resets data_versions, so bodies cached for the previous
+        # size would be served again under the same version keys.
+        for name in ("read_cache", "stats_cache"):
+            if app.extensions[name] is not None:
+                app.extensions[name].clear()
+
+        started = time.perf_counter()
+        generate(
+            max(1, n_items // args.items_per_user),
+            min(n_items, args.items_per_user),
+            seed=args.seed,
+        )
+        seed_seconds = time.perf_counter() - started
+
+        counter = QueryCounter(db.engine)
+        cases = build_cases(client, bench_context(client))
+        dialect = db.engine.dialect.name
+
+    results = []
+    for name, _, make_request in cases:
+        result = run_case(client, counter, name, make_request, args.iterations, args.warmup)
+        results.append(result)
+        flag = "  OVER BUDGET" if result["over_budget"] else ""
+        print(
+            f"  {name:<30} p50 {result['p50_ms']:8.2f}ms  p99 {result['p99_ms']:8.2f}ms  "
+            f"{result['queries']:>3} queries  {result['peak_alloc_kb']:>9.1f} KiB  "
+            f"body {result['body_bytes'] / 1024:>9.1f} KiB{flag}"
+        )
+
+    with app.app_context():
+        event.remove(db.engine, "before_cursor_execute", counter.on_execute)
+
+    return {
+        "items": n_items,
+        "database": dialect,
+        "seed_seconds": round(seed_seconds, 2),
+        "uncovered_routes": uncovered_routes(app, cases),
+        "endpoints": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--items-per-user", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--accept-encoding", default=None)
+    parser.add_argument("--output", default="bench-results.json")
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url or "sqlite:///" + os.path.join(
+        tempfile.gettempdir(), "medialog-bench.db"
+    )
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "MAIL_TRANSPORT": "fake",
+        "READ_CACHE_BACKEND": None,
+        "EXPORT_WORKERS": 1,
+        "EXPORT_QUEUE_DEPTH": 100000,
+        "EXPORT_WORKERS_AUTOSTART": False,
+        "EXPORT_RECOVERY_INTERVAL": 0,
+    })
+
+    sizes = []
+    for n_items in args.sizes:
+        print(f"{n_items} items")
+        sizes.append(bench_size(app, n_items, args))
+
+    failures = [
+        f"{size['items']} items: {result['name']} ran {result['queries']} queries "
+        f"(budget {result['query_budget']})"
+        for size in sizes
+        for result in size["endpoints"]
+        if result["over_budget"]
+    ]
+    failures += [
+        f"No benchmark case for {route}"
+        for route in sizes[0]["uncovered_routes"]
+    ]
+
+    report = {
+        "database": sizes[0]["database"],
+        "iterations": args.iterations,
+        "items_per_user": args.items_per_user,
+        "accept_encoding": args.accept_encoding,
+        "sizes": sizes,
+        "failures": failures,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """LRU cache bounded by total value size, with a per-entry TTL."""
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+        self._scopes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, scope, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, scope):
+        if len(value) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, scope, time.monotonic() + self.ttl)
+            self._scopes.setdefault(scope, set()).add(key)
+            self._bytes += len(value)
+
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, scope):
+        with self._lock:
+            for key in self._scopes.pop(scope, ()):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        value, scope, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+        keys = self._scopes.get(scope)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._scopes[scope]
+
+    def info(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+class RedisBackend:
+    """Shares cached bodies between workers through a Redis-compatible
+    server. Needs the optional ``redis`` package."""
+
+    def __init__(self, url, ttl, prefix="medialog:cache:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(
+                "READ_CACHE_BACKEND=redis requires the 'redis' package"
+            )
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, scope):
+        scope_key = f"{self.prefix}scope:{scope}"
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, value, ex=self.ttl)
+        pipe.sadd(scope_key, self.prefix + key)
+        pipe.expire(scope_key, self.ttl)
+        pipe.execute()
+
+    def invalidate(self, scope):
+        scope_key = f"{self.prefix}scope:{scope}"
+        keys = self.client.smembers(scope_key)
+        self.client.delete(scope_key, *keys)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def info(self):
+        return {"backend": "redis"}
+
+
+class ReadCache:
+    """Caches serialized list responses for a scope and counts hits.
+
+    Keys embed the scope's version counter (see ``versions.py``), so a
+    write in any worker makes older entries unreachable; ``invalidate``
+    additionally frees them locally.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, scope):
+        self.backend.set(key, value, scope)
+
+    def invalidate(self, scope):
+        self.backend.invalidate(scope)
+
+    def clear(self):
+        """Drop every entry. Needed when the data is replaced wholesale,
+        e.g. a schema rebuild that resets the version counters."""
+        self.backend.clear()
+        self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            **self.backend.info(),
+        }
+
+
+def create_stats_cache(app, read_cache):
+    """The read cache when one is configured, else a small in-process
+    cache, so stats are memoized either way."""
+    if read_cache is not None:
+        return read_cache
+    return ReadCache(MemoryBackend(app.config["STATS_CACHE_MAX_BYTES"], app.config["READ_CACHE_TTL"]))
+
+
+def create_read_cache(app):
+    """Build the configured cache, or None when caching is off."""
+    name = app.config.get("READ_CACHE_BACKEND")
+    ttl = app.config["READ_CACHE_TTL"]
+
+    if not name:
+        return None
+    if name == "memory":
+        backend = MemoryBackend(app.config["READ_CACHE_MAX_BYTES"], ttl)
+    elif name == "redis":
+        backend = RedisBackend(app.config["READ_CACHE_URL"], ttl)
+    else:
+        raise RuntimeError(f"Unknown READ_CACHE_BACKEND {name!r}")
+
+    return ReadCache(backend)
@@ -0,0 +1,122 @@
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/csv", "text/plain", "text/html"}
+
+
+class GzipEncoder:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class Compression:
+    """Compresses responses with the best encoding the client accepts.
+
+    Buffered bodies are compressed only from ``COMPRESSION_MIN_SIZE``
+    bytes up. Streamed bodies (the CSV export) are always compressed,
+    one chunk at a time, and each chunk is flushed so the client keeps
+    receiving data while the export runs.
+    """
+
+    def __init__(self, app):
+        self.min_size = app.config["COMPRESSION_MIN_SIZE"]
+        gzip_level = app.config["COMPRESSION_GZIP_LEVEL"]
+        brotli_level = app.config["COMPRESSION_BROTLI_LEVEL"]
+
+        # In order of preference when the client weights them equally.
+        self.encoders = {}
+        if brotli is not None:
+            self.encoders["br"] = lambda: BrotliEncoder(brotli_level)
+        self.encoders["gzip"] = lambda: GzipEncoder(gzip_level)
+
+    def negotiate(self):
+        return request.accept_encodings.best_match(list(self.encoders))
+
+    def compressible(self, response):
+        return (
+            request.method != "HEAD"
+            and response.status_code >= 200
+            and response.status_code not in (204, 304)
+            and not response.direct_passthrough
+            and "Content-Encoding" not in response.headers
+            and response.mimetype in COMPRESSIBLE_MIMETYPES
+        )
+
+    def after_request(self, response):
+        if not self.compressible(response):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = self.negotiate()
+        if encoding is None:
+            return response
+
+        encoder = self.encoders[encoding]()
+        if response.is_streamed:
+            response.response = compress_stream(
+                encoder, response.iter_encoded(), response.response
+            )
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(encoder.compress(data) + encoder.finish())
+
+        response.headers["Content-Encoding"] = encoding
+        # The compressed body is a different representation of the same
+        # data, so a strong ETag would be wrong for it.
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def compress_stream(encoder, chunks, source):
+    try:
+        for chunk in chunks:
+            data = encoder.compress(chunk) + encoder.flush()
+            if data:
+                yield data
+        yield encoder.finish()
+    finally:
+        close = getattr(source, "close", None)
+        if close is not None:
+            close()
+
+
+def init_compression(app):
+    if not app.config["COMPRESSION_ENABLED"]:
+        return None
+    compression = Compression(app)
+    app.after_request(compression.after_request)
+    return compression
@@ -11,6 +11,49 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Optional read replica for GET views marked with @read_replica.
+    DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+    # Seconds before a pooled connection is replaced; -1 keeps it forever.
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() != "false"
+    # Postgres only; 0 disables it.
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 30000))
+
+    # Signs session tokens. Required unless FLASK_DEBUG is on: every
+    # worker must share it, so there is no random fallback.
+    SECRET_KEY = os.environ.get("SECRET_KEY")
+    SESSION_TOKEN_TTL = int(os.environ.get("SESSION_TOKEN_TTL", 7 * 24 * 3600))
+
+    # "auto" uses orjson when it is installed; "default" is Flask's encoder.
+    JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "auto")
+
+    # gzip, plus brotli when the "brotli" package is installed.
+    COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() != "false"
+    COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_LEVEL = int(os.environ.get("COMPRESSION_BROTLI_LEVEL", 4))
+
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() != "false"
+
+    EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))
+
+    # Off unless set to "memory" or "redis".
+    READ_CACHE_BACKEND = os.environ.get("READ_CACHE_BACKEND")
+    READ_CACHE_MAX_BYTES = int(os.environ.get("READ_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    READ_CACHE_TTL = int(os.environ.get("READ_CACHE_TTL", 300))
+    READ_CACHE_URL = os.environ.get("READ_CACHE_URL", "redis://localhost:6379/0")
+
+    # GET /users/<id>/stats bodies are always cached; this bounds the
+    # in-process cache used when READ_CACHE_BACKEND is off.
+    STATS_CACHE_MAX_BYTES = int(os.environ.get("STATS_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+
+    BULK_IMPORT_BATCH_SIZE = int(os.environ.get("BULK_IMPORT_BATCH_SIZE", 1000))
+    BULK_IMPORT_MAX_ROWS = int(os.environ.get("BULK_IMPORT_MAX_ROWS", 50000))
+
     MAIL_SERVER = (
         os.environ.get("MAIL_SERVER")
         or os.environ.get("SMTP_HOST")
@@ -38,4 +81,22 @@ class Config:
         or "MediaLog <no-reply@medialog.test>"
     )
     MAILTRAP_API_TOKEN = os.environ.get("MAILTRAP_API_TOKEN")
-    MAILTRAP_INBOX_ID = os.environ.get("MAILTRAP_INBOX_ID")
\ No newline at end of file
+    MAILTRAP_INBOX_ID = os.environ.get("MAILTRAP_INBOX_ID")
+
+    MAIL_TRANSPORT = os.environ.get("MAIL_TRANSPORT", "mailtrap")
+    MAIL_USE_TLS = os.environ.get("MAIL_USE_TLS", "true").lower() != "false"
+    MAIL_POOL_SIZE = int(os.environ.get("MAIL_POOL_SIZE", 4))
+    MAIL_POOL_TIMEOUT = float(os.environ.get("MAIL_POOL_TIMEOUT", 10))
+    MAIL_CONNECTION_MAX_IDLE = int(os.environ.get("MAIL_CONNECTION_MAX_IDLE", 60))
+
+    EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", 2))
+    EXPORT_QUEUE_DEPTH = int(os.environ.get("EXPORT_QUEUE_DEPTH", 50))
+    EXPORT_MAX_ATTEMPTS = int(os.environ.get("EXPORT_MAX_ATTEMPTS", 3))
+    EXPORT_RETRY_BACKOFF = float(os.environ.get("EXPORT_RETRY_BACKOFF", 2))
+    # Ready export jobs a worker builds and emails with one send call.
+    EXPORT_MAIL_BATCH_SIZE = int(os.environ.get("EXPORT_MAIL_BATCH_SIZE", 10))
+    EXPORT_JOB_STALE_SECONDS = int(os.environ.get("EXPORT_JOB_STALE_SECONDS", 600))
+    # Start the pool with the app rather than on the first export.
+    EXPORT_WORKERS_AUTOSTART = os.environ.get("EXPORT_WORKERS_AUTOSTART", "true").lower() != "false"
+    # Seconds between sweeps for pending export jobs; 0 sweeps once at startup.
+    EXPORT_RECOVERY_INTERVAL = int(os.environ.get("EXPORT_RECOVERY_INTERVAL", 60))
@@ -0,0 +1,88 @@
+import sqlite3
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+REPLICA_BIND = "replica"
+
+
+def engine_options(config, uri):
+    """Pool and timeout options for an engine on ``uri``, from ``DB_*``
+    settings. In-memory SQLite keeps SQLAlchemy's defaults."""
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+
+    options = {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+
+    timeout = config["DB_STATEMENT_TIMEOUT_MS"]
+    if timeout and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+
+    return options
+
+
+def configure_engines(app):
+    """Fill in engine options and the replica bind before ``db.init_app``."""
+    config = app.config
+    config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS",
+        engine_options(config, config["SQLALCHEMY_DATABASE_URI"]),
+    )
+
+    replica_uri = config.get("DATABASE_REPLICA_URL")
+    if replica_uri:
+        binds = dict(config.get("SQLALCHEMY_BINDS") or {})
+        binds[REPLICA_BIND] = {"url": replica_uri, **engine_options(config, replica_uri)}
+        config["SQLALCHEMY_BINDS"] = binds
+
+
+@event.listens_for(Engine, "connect")
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores foreign keys, and so ON DELETE CASCADE, unless
+    each connection turns them on."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.close()
+
+
+def read_replica(view):
+    """Let a GET view read from the replica, when one is configured."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_replica = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Sends reads from ``read_replica`` views to the replica engine.
+
+    Once the request flushes or runs an INSERT/UPDATE/DELETE, it sticks
+    to the primary for the rest of the request, so it reads its own
+    writes. Everything else, including background workers, uses the
+    primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context() and g.get("db_replica"):
+            is_write = self._flushing or getattr(clause, "is_dml", False)
+            if is_write:
+                g.db_replica = False
+            else:
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    return replica
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
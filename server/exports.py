@@ -0,0 +1,79 @@
+import io
+import csv
+
+from .models import db, Item
+
+EXPORT_HEADER = [
+    "id",
+    "title",
+    "category_id",
+    "image_url",
+    "category_name",
+    "tags",
+    "creators",
+]
+
+LIST_SEPARATOR = "; "
+
+
+def export_row(item):
+    return [
+        item.id,
+        item.title,
+        item.category_id,
+        item.image_url or "",
+        item.category.name if item.category else "",
+        LIST_SEPARATOR.join(t.name for t in item.tags),
+        LIST_SEPARATOR.join(c.name for c in item.creators),
+    ]
+
+
+def keyset_chunks(stmt, chunk_size):
+    """Yield the items of ``stmt`` in id order, one query per chunk."""
+    after = None
+    while True:
+        page = stmt.order_by(Item.id).limit(chunk_size)
+        if after is not None:
+            page = page.where(Item.id > after)
+
+        items = db.session.scalars(page).all()
+        if items:
+            yield items
+        if len(items) < chunk_size:
+            return
+        after = items[-1].id
+
+
+def iter_items_csv(stmt, chunk_size=1000, on_chunk=None):
+    """Yield the CSV export of the ``select(Item)`` statement ``stmt`` one
+    chunk of rows at a time.
+
+    Rows are fetched with ``yield_per`` (a server-side cursor on
+    Postgres), so only ``chunk_size`` items and their relations are held
+    in memory at once. With ``on_chunk``, each chunk is instead its own
+    keyset query, so no cursor is open between chunks, and
+    ``on_chunk(rows_written)`` is called after each one; it may commit.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_HEADER)
+
+    if on_chunk is None:
+        chunks = db.session.scalars(
+            stmt.order_by(Item.id).execution_options(yield_per=chunk_size)
+        ).partitions()
+    else:
+        chunks = keyset_chunks(stmt, chunk_size)
+
+    count = 0
+    for chunk in chunks:
+        writer.writerows(export_row(item) for item in chunk)
+        count += len(chunk)
+        if on_chunk is not None:
+            on_chunk(count)
+
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+
+    yield output.getvalue()
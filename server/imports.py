@@ -0,0 +1,246 @@
+import io
+import csv
+import json
+
+from sqlalchemy import insert, select
+
+from .models import db, Category, Item, Tag, Creator, ItemTag, ItemCreator
+from .exports import LIST_SEPARATOR
+from .stats import add_counts, item_counts
+
+CSV_TYPES = ("text/csv", "application/csv")
+JSON_LINES_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-lines")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def parse_rows(body, mimetype):
+    """Return ``(row_number, dict)`` pairs from a CSV or JSON lines body,
+    and a ``row_errors`` report for JSON lines that can't be parsed."""
+    if mimetype in CSV_TYPES:
+        reader = csv.DictReader(io.StringIO(body))
+        try:
+            if not reader.fieldnames or "title" not in reader.fieldnames:
+                raise ImportFormatError("CSV must have a header row with a title column")
+            # Row 1 is the header, so data starts on row 2.
+            return list(enumerate(reader, start=2)), []
+        except csv.Error as e:
+            raise ImportFormatError(f"CSV line {reader.line_num} could not be parsed: {e}")
+
+    if mimetype in JSON_LINES_TYPES:
+        rows = []
+        row_errors = []
+        for number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row_errors.append({"row": number, "errors": ["Row is not valid JSON"]})
+                continue
+            if not isinstance(row, dict):
+                row_errors.append({"row": number, "errors": ["Row must be a JSON object"]})
+                continue
+            rows.append((number, row))
+        return rows, row_errors
+
+    raise ImportFormatError(
+        "Content-Type must be text/csv or application/x-ndjson"
+    )
+
+
+def split_names(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(LIST_SEPARATOR.strip())
+    if not isinstance(value, list):
+        return None
+    names = []
+    for name in value:
+        if not isinstance(name, str):
+            return None
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def text_value(row, field, errors):
+    """Return ``row[field]`` stripped, or None when it's missing or blank.
+    JSON lines can carry any type, so a non-string adds an error."""
+    value = row.get(field)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        errors.append(f"{field} must be a string")
+        return None
+    return value.strip() or None
+
+
+def clean_row(row):
+    """Normalise one import row; returns ``(values, errors)``."""
+    errors = []
+
+    title = text_value(row, "title", errors)
+    if title is None:
+        if not errors:
+            errors.append("Missing field: title")
+    elif len(title) > 100:
+        errors.append("Title must be at most 100 characters")
+
+    image_url = text_value(row, "image_url", errors)
+    if image_url and len(image_url) > 255:
+        errors.append("image_url must be at most 255 characters")
+
+    category_errors = []
+    category_name = text_value(row, "category_name", category_errors)
+    errors += category_errors
+    category_id = row.get("category_id") or None
+    if category_id is not None:
+        try:
+            category_id = int(category_id)
+        except (TypeError, ValueError):
+            errors.append("category_id must be an integer")
+    if not category_name and category_id is None and not category_errors:
+        errors.append("Missing field: category_name or category_id")
+    if category_name and len(category_name) > 50:
+        errors.append("category_name must be at most 50 characters")
+
+    tags = split_names(row.get("tags"))
+    if tags is None:
+        errors.append("tags must be a list of names")
+    elif any(len(t) > 50 for t in tags):
+        errors.append("Tag names must be at most 50 characters")
+
+    creators = split_names(row.get("creators"))
+    if creators is None:
+        errors.append("creators must be a list of names")
+    elif any(len(c) > 100 for c in creators):
+        errors.append("Creator names must be at most 100 characters")
+
+    return {
+        "title": title,
+        "image_url": image_url,
+        "category_name": category_name,
+        "category_id": category_id,
+        "tags": tags or [],
+        "creators": creators or [],
+    }, errors
+
+
+def ids_by_name(model, names, extra_values=None, **filters):
+    """Map ``names`` to ids for ``model``, inserting any that are missing."""
+    if not names:
+        return {}
+
+    def lookup():
+        stmt = select(model.name, model.id).where(model.name.in_(names))
+        if filters:
+            stmt = stmt.filter_by(**filters)
+        return dict(db.session.execute(stmt).all())
+
+    found = lookup()
+    missing = [n for n in names if n not in found]
+    if missing:
+        db.session.execute(
+            insert(model),
+            [{"name": n, **(extra_values or {})} for n in missing],
+        )
+        found = lookup()
+    return found
+
+
+def import_items(user_id, rows, batch_size=1000, row_errors=()):
+    """Insert valid ``rows`` for ``user_id`` in batches.
+
+    Categories, tags and creators are resolved by name with one lookup
+    per kind for the whole import; unknown names are created. Rows that
+    fail validation are skipped and reported along with ``row_errors``
+    from parsing. The caller commits.
+    """
+    row_errors = list(row_errors)
+    valid = []
+
+    for number, row in rows:
+        values, errors = clean_row(row)
+        if errors:
+            row_errors.append({"row": number, "errors": errors})
+        else:
+            valid.append((number, values))
+
+    category_ids = {
+        values["category_id"]
+        for _, values in valid
+        if not values["category_name"]
+    }
+    owned_category_ids = set()
+    if category_ids:
+        owned_category_ids = set(db.session.scalars(
+            select(Category.id).where(
+                Category.id.in_(category_ids),
+                Category.user_id == user_id,
+            )
+        ))
+
+    resolved = []
+    for number, values in valid:
+        if not values["category_name"] and values["category_id"] not in owned_category_ids:
+            row_errors.append({"row": number, "errors": ["Category does not exist"]})
+        else:
+            resolved.append(values)
+
+    categories = ids_by_name(
+        Category,
+        list(dict.fromkeys(v["category_name"] for v in resolved if v["category_name"])),
+        extra_values={"user_id": user_id},
+        user_id=user_id,
+    )
+    tags = ids_by_name(Tag, list(dict.fromkeys(n for v in resolved for n in v["tags"])))
+    creators = ids_by_name(
+        Creator,
+        list(dict.fromkeys(n for v in resolved for n in v["creators"])),
+    )
+
+    for start in range(0, len(resolved), batch_size):
+        batch = resolved[start:start + batch_size]
+
+        item_ids = db.session.scalars(
+            insert(Item).returning(Item.id, sort_by_parameter_order=True),
+            [
+                {
+                    "title": v["title"],
+                    "user_id": user_id,
+                    "category_id": (
+                        categories[v["category_name"]]
+                        if v["category_name"]
+                        else v["category_id"]
+                    ),
+                    "image_url": v["image_url"],
+                }
+                for v in batch
+            ],
+        ).all()
+
+        item_tags = [
+            {"item_id": item_id, "tag_id": tags[name]}
+            for item_id, v in zip(item_ids, batch)
+            for name in v["tags"]
+        ]
+        if item_tags:
+            db.session.execute(insert(ItemTag), item_tags)
+
+        item_creators = [
+            {"item_id": item_id, "creator_id": creators[name]}
+            for item_id, v in zip(item_ids, batch)
+            for name in v["creators"]
+        ]
+        if item_creators:
+            db.session.execute(insert(ItemCreator), item_creators)
+
+        add_counts(item_counts(Item.id.in_(item_ids)))
+
+    row_errors.sort(key=lambda e: e["row"])
+    return len(resolved), row_errors
@@ -0,0 +1,313 @@
+import time
+import queue
+import threading
+from datetime import timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from .models import db, utcnow, ExportJob, Item
+from .mail import MailConfigError
+
+ACTIVE_STATUSES = ("building", "sending")
+
+
+class JobReclaimed(Exception):
+    """A job's ``updated_at`` no longer matches what this worker wrote:
+    a recovery sweep reset it, and another worker may be running it."""
+
+
+class ExportWorkerPool:
+    """A fixed set of worker threads draining a bounded queue of
+    ``ExportJob`` ids.
+
+    A worker takes up to ``EXPORT_MAIL_BATCH_SIZE`` ready jobs off the
+    queue, builds their CSVs and emails them with one transport call.
+    Job state lives in the ``export_jobs`` table. A sweeper thread
+    re-queues pending jobs when the pool starts and every
+    ``EXPORT_RECOVERY_INTERVAL`` seconds after, so work left by a restart
+    or a full queue is picked up without waiting for a new export.
+
+    ``updated_at`` is the claim on a running job. A worker writes to its
+    jobs only where ``updated_at`` still holds the value it last wrote,
+    and refreshes it after every chunk of rows. A job that stops
+    refreshing for ``EXPORT_JOB_STALE_SECONDS`` is reset by a sweep in any
+    process, and its old worker drops it on its next write.
+    """
+
+    def __init__(self, app, build_csv, transport):
+        self.app = app
+        self.build_csv = build_csv
+        self.transport = transport
+
+        self.workers = app.config["EXPORT_WORKERS"]
+        self.max_attempts = app.config["EXPORT_MAX_ATTEMPTS"]
+        self.retry_backoff = app.config["EXPORT_RETRY_BACKOFF"]
+        self.batch_size = max(1, app.config["EXPORT_MAIL_BATCH_SIZE"])
+        self.stale_after = timedelta(seconds=app.config["EXPORT_JOB_STALE_SECONDS"])
+        self.recovery_interval = app.config["EXPORT_RECOVERY_INTERVAL"]
+
+        self.queue = queue.Queue(maxsize=app.config["EXPORT_QUEUE_DEPTH"])
+        self.busy = 0
+        self._threads = []
+        self._lock = threading.Lock()
+        # Ids queued or running in this process, so a sweep neither
+        # queues a job twice nor resets one a worker is still on.
+        self._queued = set()
+        self._running = set()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+
+            for n in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run,
+                    name=f"export-worker-{n}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+            sweeper = threading.Thread(
+                target=self._sweep,
+                name="export-recovery",
+                daemon=True,
+            )
+            sweeper.start()
+            self._threads.append(sweeper)
+
+    def submit(self, job_id):
+        """Queue a job; raises ``queue.Full`` when the pool is saturated."""
+        self.start()
+        self._enqueue(job_id)
+
+    def _enqueue(self, job_id):
+        with self._lock:
+            if job_id in self._queued:
+                return
+            self.queue.put_nowait(job_id)
+            self._queued.add(job_id)
+
+    def _sweep(self):
+        while True:
+            self.recover()
+            if self.recovery_interval <= 0:
+                return
+            time.sleep(self.recovery_interval)
+
+    def recover(self):
+        """Reset stale in-flight jobs to ``pending`` and queue every
+        pending job not already queued here.
+
+        The reset matches on ``updated_at`` and stamps a new one, so a job
+        whose worker is still writing is left alone, and one that is
+        reset can't be written by its old worker.
+        """
+        with self._lock:
+            running = list(self._running)
+
+        with self.app.app_context():
+            try:
+                db.session.execute(
+                    update(ExportJob)
+                    .where(
+                        ExportJob.status.in_(ACTIVE_STATUSES),
+                        ExportJob.updated_at < utcnow() - self.stale_after,
+                        ExportJob.id.notin_(running),
+                    )
+                    .values(status="pending", updated_at=utcnow())
+                )
+                job_ids = db.session.scalars(
+                    select(ExportJob.id)
+                    .where(ExportJob.status == "pending")
+                    .order_by(ExportJob.id)
+                ).all()
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                self.app.logger.error("Could not recover export jobs: %r", e)
+                return
+
+        for job_id in job_ids:
+            try:
+                self._enqueue(job_id)
+            except queue.Full:
+                break
+
+    def _take_batch(self):
+        """Block for one job id, then take any others already waiting,
+        up to ``batch_size``."""
+        job_ids = [self.queue.get()]
+        while len(job_ids) < self.batch_size:
+            try:
+                job_ids.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return job_ids
+
+    def _run(self):
+        while True:
+            job_ids = self._take_batch()
+            with self._lock:
+                self._queued.difference_update(job_ids)
+                self._running.update(job_ids)
+                self.busy += 1
+            try:
+                with self.app.app_context():
+                    try:
+                        self.process(job_ids)
+                    except Exception as e:
+                        self.app.logger.exception("Export jobs %s crashed", job_ids)
+                        for job_id in job_ids:
+                            self.fail_crashed(job_id, e)
+            finally:
+                with self._lock:
+                    self._running.difference_update(job_ids)
+                    self.busy -= 1
+                for _ in job_ids:
+                    self.queue.task_done()
+
+    def process(self, job_ids):
+        """Build the CSV for each job, then email all that built in one
+        batch."""
+        ready = []
+        for job_id in job_ids:
+            built = self.build(job_id)
+            if built is not None:
+                ready.append(built)
+
+        if ready:
+            self.send_export_emails(ready)
+
+    def advance(self, job_id, stamp, **values):
+        """Write ``values`` to a job this worker holds, provided its
+        ``updated_at`` is still ``stamp``, and return the new stamp.
+        Raises ``JobReclaimed`` when it isn't."""
+        new_stamp = max(utcnow(), stamp + timedelta(microseconds=1))
+        moved = db.session.execute(
+            update(ExportJob)
+            .where(ExportJob.id == job_id, ExportJob.updated_at == stamp)
+            .values(updated_at=new_stamp, **values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+
+        if not moved:
+            self.app.logger.warning("Export job %s was reclaimed, dropping it", job_id)
+            raise JobReclaimed(job_id)
+        return new_stamp
+
+    def build(self, job_id):
+        """Claim a pending job and build its CSV; returns ``(job, csv,
+        stamp)``, or None if the job was taken elsewhere, failed or was
+        reclaimed."""
+        stamp = utcnow()
+        claimed = db.session.execute(
+            update(ExportJob)
+            .where(ExportJob.id == job_id, ExportJob.status == "pending")
+            .values(status="building", updated_at=stamp)
+        ).rowcount
+        db.session.commit()
+
+        if not claimed:
+            return None
+
+        job = db.session.get(ExportJob, job_id)
+        total_rows = db.session.scalar(
+            select(func.count(Item.id)).where(Item.user_id == job.user_id)
+        )
+
+        def record_progress(rows):
+            nonlocal stamp
+            stamp = self.advance(job_id, stamp, rows_exported=rows)
+
+        try:
+            stamp = self.advance(job_id, stamp, total_rows=total_rows, rows_exported=0)
+            csv_data = "".join(self.build_csv(job.user_id, record_progress))
+            stamp = self.advance(job_id, stamp, status="sending")
+        except JobReclaimed:
+            return None
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self.fail(job_id, stamp, e)
+            return None
+
+        return job, csv_data, stamp
+
+    def send_export_emails(self, ready):
+        """Email ``(job, csv, stamp)`` triples in one transport call,
+        retrying the ones that failed with exponential backoff."""
+        pending = ready
+        for attempt in range(1, self.max_attempts + 1):
+            held = []
+            for job, csv_data, stamp in pending:
+                try:
+                    held.append((job, csv_data, self.advance(job.id, stamp, attempts=attempt)))
+                except JobReclaimed:
+                    pass
+            pending = held
+            if not pending:
+                return
+
+            try:
+                errors = self.transport.send_exports(
+                    [(job.email, csv_data) for job, csv_data, _ in pending]
+                )
+            except MailConfigError as e:
+                for job, _, stamp in pending:
+                    self.fail(job.id, stamp, e)
+                return
+            except Exception as e:
+                errors = [e] * len(pending)
+
+            retry = []
+            for (job, csv_data, stamp), error in zip(pending, errors):
+                try:
+                    if error is None:
+                        self.advance(job.id, stamp, status="sent", error=None)
+                        self.app.logger.info("Export email sent to %s (job %s)", job.email, job.id)
+                    elif attempt == self.max_attempts:
+                        self.fail(job.id, stamp, error)
+                    else:
+                        stamp = self.advance(job.id, stamp, error=repr(error)[:255])
+                        retry.append((job, csv_data, stamp))
+                except JobReclaimed:
+                    pass
+
+            if not retry:
+                return
+
+            delay = self.retry_backoff * 2 ** (attempt - 1)
+            self.app.logger.warning(
+                "Export emails for jobs %s failed (attempt %s), retrying in %ss",
+                [job.id for job, _, _ in retry],
+                attempt,
+                delay,
+            )
+            time.sleep(delay)
+            pending = retry
+
+    def fail_crashed(self, job_id, error):
+        """Mark a job ``failed`` after an unexpected error, so it doesn't
+        report ``building`` or ``sending`` forever."""
+        db.session.rollback()
+        try:
+            db.session.execute(
+                update(ExportJob)
+                .where(ExportJob.id == job_id, ExportJob.status.in_(ACTIVE_STATUSES))
+                .values(status="failed", error=repr(error)[:255], updated_at=utcnow())
+            )
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            self.app.logger.exception("Could not mark export job %s failed", job_id)
+
+    def fail(self, job_id, stamp, error):
+        """Mark a job this worker holds ``failed``."""
+        self.app.logger.error("Export job %s failed: %r", job_id, error)
+        try:
+            self.advance(job_id, stamp, status="failed", error=repr(error)[:255])
+        except JobReclaimed:
+            pass
@@ -0,0 +1,47 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Encodes responses with ``orjson``. Types orjson can't handle
+    (``Decimal``, objects with ``__html__``) fall back to Flask's
+    default conversions."""
+
+    def _options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options())
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """Install the provider named by ``JSON_PROVIDER``: ``orjson``,
+    ``default``, or ``auto`` (orjson when it is installed)."""
+    name = app.config.get("JSON_PROVIDER", "auto")
+
+    if name == "auto":
+        name = "orjson" if orjson is not None else "default"
+
+    if name == "orjson":
+        if orjson is None:
+            raise RuntimeError("JSON_PROVIDER=orjson requires the 'orjson' package")
+        app.json = OrjsonProvider(app)
+    elif name != "default":
+        raise RuntimeError(f"Unknown JSON_PROVIDER {name!r}")
@@ -0,0 +1,330 @@
+import time
+import queue
+import base64
+import smtplib
+import threading
+from email.message import EmailMessage
+
+import mailtrap as mt
+
+EXPORT_SUBJECT = "Your MediaLog Export"
+EXPORT_TEXT = "Your MediaLog CSV export is attached."
+EXPORT_FILENAME = "medialog-export.csv"
+
+# Mailtrap's batch endpoint takes at most 500 messages and 50 MB per call.
+MAILTRAP_BATCH_LIMIT = 500
+MAILTRAP_BATCH_MAX_BYTES = 40 * 1024 * 1024
+
+
+class MailConfigError(RuntimeError):
+    """Raised when a transport is missing settings; retrying won't help."""
+
+
+class MailBackpressureError(RuntimeError):
+    """Raised when no connection frees up in time; safe to retry later."""
+
+
+class MailDeliveryError(RuntimeError):
+    """One message in a batch was refused; the rest may have gone out."""
+
+
+def raise_first(errors):
+    for error in errors:
+        if error is not None:
+            raise error
+
+
+class MailTransport:
+    """What the transports share. Each one builds a message with
+    ``export_mail`` and sends a batch with ``deliver``, which returns one
+    error, or None, per message."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def send_exports(self, exports):
+        """Email ``(to_email, csv_data)`` pairs; returns one error, or
+        None, per export."""
+        return self.deliver([self.export_mail(to, csv_data) for to, csv_data in exports])
+
+    def send_messages(self, messages):
+        """Send ``messages`` as one batch, raising the first error."""
+        raise_first(self.deliver(messages))
+        return len(messages)
+
+    def export_mail(self, to_email, csv_data):
+        raise NotImplementedError
+
+    def deliver(self, messages):
+        raise NotImplementedError
+
+
+class MailtrapTransport(MailTransport):
+    """Sends through the Mailtrap API, reusing one HTTP session per thread.
+
+    ``MailtrapClient.send`` builds a new session (and TLS handshake) on
+    every call, so the sending API object is created once and kept.
+    Batches go to the batch endpoint, one call per ``MAILTRAP_BATCH_LIMIT``
+    messages or ``MAILTRAP_BATCH_MAX_BYTES`` of attachments.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._local = threading.local()
+
+    def _sending_api(self):
+        sending_api = getattr(self._local, "sending_api", None)
+        if sending_api is not None:
+            return sending_api
+
+        api_token = self.app.config.get("MAILTRAP_API_TOKEN")
+        inbox_id = self.app.config.get("MAILTRAP_INBOX_ID")
+
+        if not api_token or not inbox_id:
+            raise MailConfigError(
+                "Mailtrap API token or inbox ID missing. "
+                f"MAILTRAP_API_TOKEN={bool(api_token)!r}, "
+                f"MAILTRAP_INBOX_ID={bool(inbox_id)!r}"
+            )
+
+        client = mt.MailtrapClient(
+            token=api_token,
+            sandbox=True,
+            inbox_id=inbox_id,
+        )
+        self._local.sending_api = client.sending_api
+        return self._local.sending_api
+
+    def export_mail(self, to_email, csv_data):
+        csv_bytes = csv_data.encode("utf-8")
+        csv_b64 = base64.b64encode(csv_bytes)
+
+        return mt.Mail(
+            sender=mt.Address(
+                email="no-reply@medialog.test",
+                name="MediaLog",
+            ),
+            to=[mt.Address(email=to_email)],
+            subject=EXPORT_SUBJECT,
+            text=EXPORT_TEXT,
+            attachments=[
+                mt.Attachment(
+                    content=csv_b64,
+                    filename=EXPORT_FILENAME,
+                    disposition=mt.Disposition.ATTACHMENT,
+                    mimetype="text/csv",
+                )
+            ],
+        )
+
+    def deliver(self, messages):
+        """Send ``mt.Mail`` messages through the batch endpoint; returns
+        one error, or None, per message."""
+        sending_api = self._sending_api()
+
+        errors = []
+        for chunk in self._chunks(messages):
+            try:
+                response = sending_api.batch_send(mt.BatchSendEmailParams(
+                    base=mt.BatchMail(sender=chunk[0].sender, subject=chunk[0].subject),
+                    requests=[batch_request(mail) for mail in chunk],
+                ))
+            except Exception as e:
+                errors.extend([e] * len(chunk))
+                continue
+
+            results = response.responses or []
+            for n in range(len(chunk)):
+                result = results[n] if n < len(results) else None
+                if result is not None and result.success:
+                    errors.append(None)
+                else:
+                    reasons = (result and result.errors) or response.errors or ["no result"]
+                    errors.append(MailDeliveryError("; ".join(reasons)))
+        return errors
+
+    def _chunks(self, messages):
+        chunk, size = [], 0
+        for mail in messages:
+            mail_size = sum(len(a.content) for a in mail.attachments or ())
+            if chunk and (
+                len(chunk) == MAILTRAP_BATCH_LIMIT
+                or size + mail_size > MAILTRAP_BATCH_MAX_BYTES
+            ):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(mail)
+            size += mail_size
+        if chunk:
+            yield chunk
+
+
+def batch_request(mail):
+    return mt.BatchEmailRequest(
+        to=mail.to,
+        sender=mail.sender,
+        cc=mail.cc,
+        bcc=mail.bcc,
+        subject=mail.subject,
+        text=mail.text,
+        html=mail.html,
+        category=mail.category,
+        attachments=mail.attachments,
+        headers=mail.headers,
+        custom_variables=mail.custom_variables,
+        reply_to=mail.reply_to,
+    )
+
+
+class SMTPTransport(MailTransport):
+    """Sends over a bounded pool of persistent SMTP connections.
+
+    Each connection pays the connect/STARTTLS/login handshake once and
+    is reused for later messages. When all ``MAIL_POOL_SIZE``
+    connections are busy, senders wait up to ``MAIL_POOL_TIMEOUT``
+    seconds and then get ``MailBackpressureError``.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.host = app.config.get("MAIL_SERVER")
+        self.port = app.config.get("MAIL_PORT")
+        self.use_tls = app.config.get("MAIL_USE_TLS", True)
+        self.username = app.config.get("MAIL_USERNAME")
+        self.password = app.config.get("MAIL_PASSWORD")
+        self.sender = app.config.get("MAIL_FROM")
+
+        self.pool_size = app.config.get("MAIL_POOL_SIZE", 4)
+        self.pool_timeout = app.config.get("MAIL_POOL_TIMEOUT", 10)
+        self.max_idle = app.config.get("MAIL_CONNECTION_MAX_IDLE", 60)
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+
+    def connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.use_tls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password)
+        return smtp
+
+    def _checkout(self):
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            raise MailBackpressureError(
+                f"All {self.pool_size} SMTP connections busy for {self.pool_timeout}s"
+            )
+
+        try:
+            try:
+                smtp, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self.connect()
+
+            if time.monotonic() - last_used > self.max_idle:
+                try:
+                    smtp.noop()
+                except smtplib.SMTPException:
+                    self._discard(smtp)
+                    return self.connect()
+
+            return smtp
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkin(self, smtp):
+        self._idle.put((smtp, time.monotonic()))
+        self._slots.release()
+
+    def _discard(self, smtp):
+        try:
+            smtp.close()
+        except OSError:
+            pass
+
+    def export_mail(self, to_email, csv_data):
+        msg = EmailMessage()
+        msg["Subject"] = EXPORT_SUBJECT
+        msg["From"] = self.sender
+        msg["To"] = to_email
+        msg.set_content(EXPORT_TEXT)
+        msg.add_attachment(
+            csv_data.encode("utf-8"),
+            maintype="text",
+            subtype="csv",
+            filename=EXPORT_FILENAME,
+        )
+        return msg
+
+    def deliver(self, messages):
+        """Send ``messages`` over one pooled connection; returns one
+        error, or None, per message. A message the server refuses
+        doesn't stop the rest, but a lost connection fails every message
+        not yet sent."""
+        smtp = self._checkout()
+
+        errors = []
+        try:
+            for msg in messages:
+                try:
+                    try:
+                        smtp.send_message(msg)
+                    except smtplib.SMTPServerDisconnected:
+                        # The server dropped an idle connection; reconnect once.
+                        self._discard(smtp)
+                        smtp = self.connect()
+                        smtp.send_message(msg)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                    errors.append(e)
+                else:
+                    errors.append(None)
+        except Exception as e:
+            self._discard(smtp)
+            self._slots.release()
+            return errors + [e] * (len(messages) - len(errors))
+
+        self._checkin(smtp)
+        return errors
+
+    def close(self):
+        while True:
+            try:
+                smtp, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                smtp.quit()
+            except smtplib.SMTPException:
+                self._discard(smtp)
+
+
+class FakeTransport(MailTransport):
+    """Keeps sent exports in memory; for local runs and tests."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.outbox = []
+        self.batches = []
+
+    def export_mail(self, to_email, csv_data):
+        return {"to": to_email, "csv": csv_data}
+
+    def deliver(self, messages):
+        self.outbox.extend(messages)
+        self.batches.append(len(messages))
+        return [None] * len(messages)
+
+
+TRANSPORTS = {
+    "mailtrap": MailtrapTransport,
+    "smtp": SMTPTransport,
+    "fake": FakeTransport,
+}
+
+
+def create_transport(app):
+    name = app.config.get("MAIL_TRANSPORT", "mailtrap")
+    if name not in TRANSPORTS:
+        raise MailConfigError(f"Unknown MAIL_TRANSPORT {name!r}")
+    return TRANSPORTS[name](app)
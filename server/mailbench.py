@@ -0,0 +1,111 @@
+"""Measure outbound mail throughput against a local SMTP sink.
+
+    pip install aiosmtpd
+    python -m server.mailbench --messages 500 --threads 4 --batch 25
+
+Compares one SMTP session per message (the old ``/smtp-test`` path)
+with the pooled ``SMTPTransport``, sending single messages and batches.
+"""
+
+import time
+import socket
+import argparse
+import smtplib
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+from .mail import SMTPTransport
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_sink(port):
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        raise SystemExit("mailbench requires the 'aiosmtpd' package")
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    return controller, handler
+
+
+def make_transport(port, pool_size):
+    app = SimpleNamespace(config={
+        "MAIL_SERVER": "127.0.0.1",
+        "MAIL_PORT": port,
+        "MAIL_USE_TLS": False,
+        "MAIL_FROM": "MediaLog <no-reply@medialog.test>",
+        "MAIL_POOL_SIZE": pool_size,
+    })
+    return SMTPTransport(app)
+
+
+def run(label, send, count, threads, handler):
+    before = handler.received
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(send, range(count)))
+    elapsed = time.perf_counter() - started
+
+    delivered = handler.received - before
+    print(f"{label:<28} {delivered:>6} msgs  {elapsed:7.3f}s  {delivered / elapsed:9.1f} msgs/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=25)
+    parser.add_argument("--csv-rows", type=int, default=200)
+    args = parser.parse_args()
+
+    port = free_port()
+    controller, handler = start_sink(port)
+    transport = make_transport(port, args.threads)
+
+    csv_data = "id,title\n" + "".join(
+        f"{i},Item {i}\n" for i in range(args.csv_rows)
+    )
+
+    def message(i):
+        return transport.export_mail(f"user{i}@example.com", csv_data)
+
+    def per_message(i):
+        with smtplib.SMTP("127.0.0.1", port) as smtp:
+            smtp.send_message(message(i))
+
+    def pooled(i):
+        transport.send_messages([message(i)])
+
+    def batched(i):
+        transport.send_messages([
+            message(i * args.batch + n) for n in range(args.batch)
+        ])
+
+    try:
+        run("connection per message", per_message, args.messages, args.threads, handler)
+        run("pooled", pooled, args.messages, args.threads, handler)
+        run(f"pooled, batches of {args.batch}", batched,
+            max(1, args.messages // args.batch), args.threads, handler)
+    finally:
+        transport.close()
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import bisect
+import threading
+from time import perf_counter
+
+from flask import request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+POOL_WAIT_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 0.5, 1, 5, 30)
+
+BACKGROUND_ROUTE = "(background)"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values, extra=""):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, label_values=(), amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for label_values, value in sorted(self.values.items()):
+            yield f"{self.name}{format_labels(self.labels, label_values)} {format_value(value)}"
+
+
+class Histogram:
+    """Fixed-bucket histogram. Buckets are stored per bucket and only
+    made cumulative when rendered, so ``observe`` touches one slot."""
+
+    def __init__(self, name, help, buckets, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, value, label_values=()):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for label_values, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % (bound if bound == "+Inf" else format_value(float(bound)))
+                yield f"{self.name}_bucket{format_labels(self.labels, label_values, le)} {cumulative}"
+            labels = format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {format_value(float(total))}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Gauge:
+    """Reads its value from a callback at scrape time."""
+
+    def __init__(self, name, help, read):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self):
+        value = self.read()
+        if value is None:
+            return
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {format_value(value)}"
+
+
+class Metrics:
+    """Per-route request and SQL metrics in Prometheus text format.
+
+    Request hooks keep a thread-local tally of the statements a request
+    runs; the tally is folded into the shared series under one lock when
+    the request tears down, or when a streamed response is closed.
+    Statements outside a request (export workers) are counted under the
+    ``(background)`` route.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.requests = Counter(
+            "medialog_http_requests_total",
+            "Requests handled, by route, method and status.",
+            ("route", "method", "status"),
+        )
+        self.latency = Histogram(
+            "medialog_http_request_duration_seconds",
+            "Request latency by route.",
+            LATENCY_BUCKETS,
+            ("route", "method"),
+        )
+        self.queries = Counter(
+            "medialog_sql_queries_total",
+            "SQL statements executed, by route.",
+            ("route",),
+        )
+        self.query_seconds = Counter(
+            "medialog_sql_query_seconds_total",
+            "Time spent executing SQL statements, by route.",
+            ("route",),
+        )
+        self.queries_per_request = Histogram(
+            "medialog_sql_queries_per_request",
+            "SQL statements per request, by route.",
+            QUERY_COUNT_BUCKETS,
+            ("route",),
+        )
+        self.pool_wait = Histogram(
+            "medialog_db_pool_checkout_wait_seconds",
+            "Time spent waiting to check a connection out of the pool.",
+            POOL_WAIT_BUCKETS,
+        )
+        self.gauges = []
+
+    def add_gauge(self, name, help, read):
+        self.gauges.append(Gauge(name, help, read))
+
+    # Request hooks
+
+    def before_request(self):
+        state = self._local
+        state.route = None
+        state.method = request.method
+        state.status = 500
+        state.streamed = False
+        state.queries = 0
+        state.query_seconds = 0.0
+        state.started = perf_counter()
+
+    def after_request(self, response):
+        state = self._local
+        rule = request.url_rule
+        state.route = rule.rule if rule is not None else "unmatched"
+        state.status = response.status_code
+        if response.is_streamed:
+            # Tally the streamed body too; its queries run after teardown.
+            state.streamed = True
+            response.call_on_close(self.finish)
+        return response
+
+    def teardown_request(self, exc):
+        if not getattr(self._local, "streamed", False):
+            self.finish()
+
+    def finish(self):
+        state = self._local
+        started = getattr(state, "started", None)
+        if started is None:
+            return
+        state.started = None
+
+        elapsed = perf_counter() - started
+        route = state.route
+        if route is None:
+            rule = request.url_rule
+            route = rule.rule if rule is not None else "unmatched"
+
+        with self._lock:
+            self.requests.inc((route, state.method, state.status))
+            self.latency.observe(elapsed, (route, state.method))
+            self.queries_per_request.observe(state.queries, (route,))
+            if state.queries:
+                self.queries.inc((route,), state.queries)
+                self.query_seconds.inc((route,), state.query_seconds)
+
+    # Engine hooks
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - context._metrics_started
+        state = self._local
+        if getattr(state, "started", None) is not None:
+            state.queries += 1
+            state.query_seconds += elapsed
+            return
+
+        with self._lock:
+            self.queries.inc((BACKGROUND_ROUTE,))
+            self.query_seconds.inc((BACKGROUND_ROUTE,), elapsed)
+
+    def instrument_engine(self, engine):
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+        event.listen(engine, "engine_disposed", lambda e: self.instrument_pool(e.pool))
+        self.instrument_pool(engine.pool)
+
+    def instrument_pool(self, pool):
+        """Time ``pool.connect()``: the wait for a free connection, plus
+        the connect itself when the pool has to open a new one."""
+        if getattr(pool, "_metrics_wrapped", False):
+            return
+        connect = pool.connect
+
+        def timed_connect():
+            started = perf_counter()
+            try:
+                return connect()
+            finally:
+                elapsed = perf_counter() - started
+                with self._lock:
+                    self.pool_wait.observe(elapsed)
+
+        pool.connect = timed_connect
+        pool._metrics_wrapped = True
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in (
+                self.requests,
+                self.latency,
+                self.queries,
+                self.query_seconds,
+                self.queries_per_request,
+                self.pool_wait,
+            ):
+                lines.extend(metric.render())
+        for gauge in self.gauges:
+            lines.extend(gauge.render())
+        return "\n".join(lines) + "\n"
+
+
+def init_metrics(app, engines):
+    """Hook request timing into ``app`` and statement counting into every
+    engine (the primary and any replica). Pool gauges describe the
+    primary, the first engine."""
+    metrics = Metrics()
+    app.before_request(metrics.before_request)
+    app.after_request(metrics.after_request)
+    app.teardown_request(metrics.teardown_request)
+
+    for engine in engines:
+        metrics.instrument_engine(engine)
+
+    primary = engines[0]
+    metrics.add_gauge(
+        "medialog_db_pool_checked_out",
+        "Connections currently checked out of the pool.",
+        lambda: getattr(primary.pool, "checkedout", lambda: None)(),
+    )
+    metrics.add_gauge(
+        "medialog_db_pool_size",
+        "Configured size of the connection pool.",
+        lambda: getattr(primary.pool, "size", lambda: None)(),
+    )
+    return metrics
@@ -1,6 +1,12 @@
+from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from .database import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 class User(db.Model):
     __tablename__ = "users"
@@ -46,21 +52,51 @@ class Item(db.Model):
 
     image_url = db.Column(db.String(255))
 
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # Link rows and reviews go with the item through ON DELETE CASCADE,
+    # so deleting an item never loads these collections.
     tags = db.relationship(
         "Tag",
         secondary="item_tags",
-        back_populates="items"
+        back_populates="items",
+        passive_deletes=True,
     )
 
     creators = db.relationship(
         "Creator",
         secondary="item_creators",
         back_populates="items",
+        passive_deletes=True,
     )
 
+    __table_args__ = (
+        db.Index("ix_items_user_id_category_id", "user_id", "category_id"),
+        db.Index("ix_items_user_id_title", "user_id", "title", "id"),
+        db.Index("ix_items_category_id", "category_id"),
+    )
+
+    @property
+    def avg_rating(self):
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
     def __repr__(self):
         return f"<Item {self.title}>"
     
+# Postgres indexes lower(name) in "C" collation so prefix LIKE and ORDER BY
+# share the index; SQLite has no "C" collation. The Postgres expression is
+# written the way Postgres reports it back, so autogenerate compares it
+# equal to the database.
+def lower_name_indexes(index_name):
+    return (
+        db.Index(index_name, db.text('lower(name::text COLLATE "C")')).ddl_if(dialect="postgresql"),
+        db.Index(index_name, db.text("lower(name)")).ddl_if(dialect="sqlite"),
+    )
+
+
 class Tag(db.Model):
     __tablename__ = "tags"
 
@@ -70,21 +106,23 @@ class Tag(db.Model):
     items = db.relationship(
         "Item",
         secondary="item_tags",
-        back_populates="tags"
+        back_populates="tags",
+        passive_deletes=True,
     )
 
+    __table_args__ = lower_name_indexes("ix_tags_lower_name")
+
     def __repr__(self):
         return f"<Tag {self.name}>"
     
 class ItemTag(db.Model):
     __tablename__ = "item_tags"
 
-    id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey("items.id"), nullable=False)
-    tag_id = db.Column(db.Integer, db.ForeignKey("tags.id"), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey("items.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
 
     __table_args__ = (
-        db.UniqueConstraint("item_id", "tag_id", name="uix_item_tag"),
+        db.Index("ix_item_tags_tag_id_item_id", "tag_id", "item_id"),
     )
 
 class Creator(db.Model):
@@ -97,20 +135,22 @@ class Creator(db.Model):
         "Item",
         secondary="item_creators",
         back_populates="creators",
+        passive_deletes=True,
     )
 
+    __table_args__ = lower_name_indexes("ix_creators_lower_name")
+
     def __repr__(self):
         return f"<Creator {self.name}>"
     
 class ItemCreator(db.Model):
     __tablename__ = "item_creators"
 
-    id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey("items.id"), nullable=False)
-    creator_id = db.Column(db.Integer, db.ForeignKey("creators.id"), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey("items.id", ondelete="CASCADE"), primary_key=True)
+    creator_id = db.Column(db.Integer, db.ForeignKey("creators.id", ondelete="CASCADE"), primary_key=True)
 
     __table_args__ = (
-        db.UniqueConstraint("item_id", "creator_id", name="uix_item_creator"),
+        db.Index("ix_item_creators_creator_id_item_id", "creator_id", "item_id"),
     )
 
 class Review(db.Model):
@@ -123,10 +163,62 @@ class Review(db.Model):
     text = db.Column(db.String(255), nullable=True)
 
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    item_id = db.Column(db.Integer, db.ForeignKey("items.id"), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey("items.id", ondelete="CASCADE"), nullable=False)
 
     user = db.relationship("User", backref="reviews")
-    item = db.relationship("Item", backref="reviews")
+    item = db.relationship(
+        "Item",
+        backref=db.backref("reviews", cascade="all, delete-orphan", passive_deletes=True),
+    )
+
+    __table_args__ = (
+        db.Index("ix_reviews_item_id_id", "item_id", "id"),
+        db.Index("ix_reviews_user_id", "user_id"),
+    )
+
+    def __repr__(self):
+        return f"<Review user={self.user_id} item={self.item_id} rating={self.rating}>"
+    
+class ExportJob(db.Model):
+    __tablename__ = "export_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    email = db.Column(db.String(120), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    total_rows = db.Column(db.Integer, nullable=True)
+    rows_exported = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(255), nullable=True)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    user = db.relationship("User", backref="export_jobs")
+
+    def __repr__(self):
+        return f"<ExportJob {self.id} user={self.user_id} status={self.status}>"
+
+class DataVersion(db.Model):
+    __tablename__ = "data_versions"
+
+    scope = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    def __repr__(self):
+        return f"<DataVersion {self.scope}={self.version}>"
+
+class UserCount(db.Model):
+    __tablename__ = "user_counts"
+
+    # Kept up to date by the write paths, like the item rating
+    # aggregates: items per category, tag and creator, and reviews per
+    # rating (0 for unrated) on the user's items.
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)
+    key_id = db.Column(db.Integer, primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
 
     def __repr__(self):
-        return f"<Review user={self.user_id} item={self.item_id} rating={self.rating}>"
\ No newline at end of file
+        return f"<UserCount user={self.user_id} {self.kind}={self.key_id} total={self.total}>"
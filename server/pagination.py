@@ -0,0 +1,119 @@
+import json
+import base64
+
+from flask import request, jsonify
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+# Cursor sort key types accepted for a sort column's Python type.
+CURSOR_KEY_TYPES = {str: (str,), int: (int,), float: (int, float)}
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, key_type=None):
+    """Decode a ``[sort_key, id]`` cursor. The id must be an integer and
+    the sort key a ``key_type`` value (any string or number if None), so
+    a forged cursor is a 400 rather than a failed comparison in SQL."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != 2:
+        raise PaginationError("Invalid cursor")
+
+    key, id_ = values
+    key_types = CURSOR_KEY_TYPES.get(key_type, (str, int, float))
+    if (
+        isinstance(key, bool) or not isinstance(key, key_types)
+        or isinstance(id_, bool) or not isinstance(id_, int)
+    ):
+        raise PaginationError("Invalid cursor")
+
+    return values
+
+
+def page_requested():
+    return "limit" in request.args or "cursor" in request.args
+
+
+def limit_arg(default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    limit = request.args.get("limit", default)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise PaginationError("limit must be an integer")
+
+    if limit < 1 or limit > maximum:
+        raise PaginationError(f"limit must be between 1 and {maximum}")
+
+    return limit
+
+
+def page_args(key_type=None):
+    limit = limit_arg()
+    cursor = request.args.get("cursor")
+    return limit, decode_cursor(cursor, key_type) if cursor else None
+
+
+def serialize_rows(rows, serialize, many):
+    return serialize(rows) if many else [serialize(row) for row in rows]
+
+
+def paginate(query, sort_column, id_column, serialize, many=False):
+    """Return one keyset page of ``query`` ordered by ``(sort_column, id)``.
+
+    The cursor carries the last row's sort key and id, so the next page
+    is a range seek on the index rather than an OFFSET scan. With
+    ``many=True``, ``serialize`` takes the whole page at once.
+    """
+    limit, after = page_args(sort_column.type.python_type)
+
+    query = query.order_by(sort_column, id_column)
+    if after is not None:
+        query = query.filter(tuple_(sort_column, id_column) > tuple_(*after))
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor([
+            getattr(last, sort_column.key),
+            getattr(last, id_column.key),
+        ])
+
+    return {
+        "results": serialize_rows(rows, serialize, many),
+        "limit": limit,
+        "next_cursor": next_cursor,
+    }
+
+
+def list_response(query, sort_column, id_column, serialize, many=False, paged=False):
+    """Serialize ``query`` as a cursor page when the client asks for one
+    with ``limit`` or ``cursor``, otherwise as the full list. With
+    ``paged=True`` it is always a page, of ``DEFAULT_LIMIT`` rows unless
+    the client asks for another limit."""
+    if not paged and not page_requested():
+        rows = query.order_by(sort_column, id_column).all()
+        return jsonify(serialize_rows(rows, serialize, many)), 200
+
+    try:
+        return paginate(query, sort_column, id_column, serialize, many), 200
+    except PaginationError as e:
+        return {"errors": [str(e)]}, 400
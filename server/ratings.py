@@ -0,0 +1,51 @@
+from sqlalchemy import func, select, update
+
+from .models import db, Item, Review
+
+
+def rating_delta(old, new):
+    """The ``(count, sum)`` change when a review's rating goes from
+    ``old`` to ``new``; unrated reviews are not counted."""
+    return (
+        (new is not None) - (old is not None),
+        (new or 0) - (old or 0),
+    )
+
+
+def apply_rating_change(item_id, old, new):
+    count_delta, sum_delta = rating_delta(old, new)
+    if not count_delta and not sum_delta:
+        return
+
+    db.session.execute(
+        update(Item)
+        .where(Item.id == item_id)
+        .values(
+            rating_count=Item.rating_count + count_delta,
+            rating_sum=Item.rating_sum + sum_delta,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rebuild_rating_aggregates():
+    """Recompute every item's aggregates from its reviews; returns the
+    number of items whose stored values were wrong."""
+    count = (
+        select(func.count(Review.rating))
+        .where(Review.item_id == Item.id)
+        .scalar_subquery()
+    )
+    total = (
+        select(func.coalesce(func.sum(Review.rating), 0))
+        .where(Review.item_id == Item.id)
+        .scalar_subquery()
+    )
+
+    result = db.session.execute(
+        update(Item)
+        .where((Item.rating_count != count) | (Item.rating_sum != total))
+        .values(rating_count=count, rating_sum=total)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
@@ -0,0 +1,373 @@
+import re
+
+from sqlalchemy import DDL, event, text
+
+from .models import db
+from .pagination import PaginationError, encode_cursor, page_args
+
+# The item_search index is maintained by triggers, so every write path
+# (ORM, bulk import, association diffs) keeps it current. Postgres stores
+# a weighted tsvector per item, with a copy of the item's user_id so
+# searches are bounded by one user's rows, and rebuilds it at commit;
+# SQLite uses an FTS5 table keyed by item id. Migrations install the Postgres objects; these
+# statements cover databases built with db.create_all().
+
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS item_search (
+        item_id INTEGER PRIMARY KEY REFERENCES items (id) ON DELETE CASCADE,
+        user_id INTEGER NOT NULL,
+        document TSVECTOR NOT NULL
+    )
+    """,
+    # A btree on user_id rather than a GIN on document: the search reads
+    # one user's rows and matches them, where the GIN posting lists for a
+    # common or prefix term span every user's items.
+    "CREATE INDEX IF NOT EXISTS ix_item_search_user_id ON item_search (user_id)",
+    # Tags and creators are aggregated once for all targets; the flush at
+    # commit can pass a whole bulk import's ids.
+    """
+    CREATE OR REPLACE FUNCTION item_search_refresh(targets INTEGER[]) RETURNS VOID AS $$
+    BEGIN
+        INSERT INTO item_search (item_id, user_id, document)
+        SELECT i.id,
+            i.user_id,
+            setweight(to_tsvector('simple', i.title), 'A')
+            || setweight(to_tsvector('simple', coalesce(t.names, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(c.names, '')), 'B')
+        FROM items i
+        LEFT JOIN (
+            SELECT it.item_id, string_agg(t.name, ' ') AS names
+            FROM item_tags it JOIN tags t ON t.id = it.tag_id
+            WHERE it.item_id = ANY (targets)
+            GROUP BY it.item_id
+        ) t ON t.item_id = i.id
+        LEFT JOIN (
+            SELECT ic.item_id, string_agg(c.name, ' ') AS names
+            FROM item_creators ic JOIN creators c ON c.id = ic.creator_id
+            WHERE ic.item_id = ANY (targets)
+            GROUP BY ic.item_id
+        ) c ON c.item_id = i.id
+        WHERE i.id = ANY (targets)
+        ON CONFLICT (item_id) DO UPDATE
+            SET user_id = EXCLUDED.user_id, document = EXCLUDED.document;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    # The write triggers only queue changed item ids. A deferred trigger
+    # then rebuilds each queued document once at commit; otherwise an item
+    # inserted with tags and creators would be rebuilt once per table.
+    # Queued rows are deleted before the transaction commits, so the
+    # tables are unlogged and only ever hold uncommitted rows.
+    """
+    CREATE UNLOGGED TABLE IF NOT EXISTS item_search_pending (
+        txid BIGINT NOT NULL,
+        item_id INTEGER NOT NULL,
+        PRIMARY KEY (txid, item_id)
+    )
+    """,
+    """
+    CREATE UNLOGGED TABLE IF NOT EXISTS item_search_flushes (
+        txid BIGINT PRIMARY KEY
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION item_search_queue(targets INTEGER[]) RETURNS VOID AS $$
+    BEGIN
+        IF cardinality(targets) = 0 THEN
+            RETURN;
+        END IF;
+        INSERT INTO item_search_pending (txid, item_id)
+        SELECT txid_current(), unnest(targets)
+        ON CONFLICT DO NOTHING;
+        INSERT INTO item_search_flushes (txid) VALUES (txid_current())
+        ON CONFLICT DO NOTHING;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION item_search_flush() RETURNS TRIGGER AS $$
+    DECLARE
+        targets INTEGER[];
+    BEGIN
+        WITH flushed AS (
+            DELETE FROM item_search_pending WHERE txid = NEW.txid RETURNING item_id
+        )
+        SELECT array_agg(item_id) INTO targets FROM flushed;
+        DELETE FROM item_search_flushes WHERE txid = NEW.txid;
+        PERFORM item_search_refresh(targets);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS item_search_flush ON item_search_flushes",
+    """
+    CREATE CONSTRAINT TRIGGER item_search_flush AFTER INSERT ON item_search_flushes
+    DEFERRABLE INITIALLY DEFERRED FOR EACH ROW
+    EXECUTE FUNCTION item_search_flush()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION item_search_from_items() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM item_search_queue(ARRAY(SELECT id FROM changed));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION item_search_from_item_updates() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM item_search_queue(ARRAY(
+            SELECT changed.id
+            FROM changed JOIN previous ON previous.id = changed.id
+            WHERE changed.title IS DISTINCT FROM previous.title
+               OR changed.user_id IS DISTINCT FROM previous.user_id
+        ));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION item_search_from_links() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM item_search_queue(ARRAY(SELECT DISTINCT item_id FROM changed));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION item_search_from_tags() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM item_search_queue(ARRAY(
+            SELECT DISTINCT it.item_id
+            FROM changed JOIN item_tags it ON it.tag_id = changed.id
+        ));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION item_search_from_creators() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM item_search_queue(ARRAY(
+            SELECT DISTINCT ic.item_id
+            FROM changed JOIN item_creators ic ON ic.creator_id = changed.id
+        ));
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER items_search_insert AFTER INSERT ON items
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_items()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER items_search_update AFTER UPDATE ON items
+    REFERENCING OLD TABLE AS previous NEW TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_item_updates()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER item_tags_search_insert AFTER INSERT ON item_tags
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_links()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER item_tags_search_delete AFTER DELETE ON item_tags
+    REFERENCING OLD TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_links()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER item_creators_search_insert AFTER INSERT ON item_creators
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_links()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER item_creators_search_delete AFTER DELETE ON item_creators
+    REFERENCING OLD TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_links()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER tags_search_update AFTER UPDATE ON tags
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_tags()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER creators_search_update AFTER UPDATE ON creators
+    REFERENCING NEW TABLE AS changed FOR EACH STATEMENT
+    EXECUTE FUNCTION item_search_from_creators()
+    """,
+]
+
+POSTGRES_DROP = [
+    "DROP TABLE IF EXISTS item_search",
+    "DROP TABLE IF EXISTS item_search_pending",
+    "DROP TABLE IF EXISTS item_search_flushes",
+    "DROP FUNCTION IF EXISTS item_search_refresh(INTEGER[]) CASCADE",
+    "DROP FUNCTION IF EXISTS item_search_queue(INTEGER[]) CASCADE",
+    "DROP FUNCTION IF EXISTS item_search_flush() CASCADE",
+    "DROP FUNCTION IF EXISTS item_search_from_items() CASCADE",
+    "DROP FUNCTION IF EXISTS item_search_from_item_updates() CASCADE",
+    "DROP FUNCTION IF EXISTS item_search_from_links() CASCADE",
+    "DROP FUNCTION IF EXISTS item_search_from_tags() CASCADE",
+    "DROP FUNCTION IF EXISTS item_search_from_creators() CASCADE",
+]
+
+SQLITE_TAGS = """
+    (SELECT group_concat(t.name, ' ')
+     FROM item_tags it JOIN tags t ON t.id = it.tag_id
+     WHERE it.item_id = {item})
+"""
+
+SQLITE_CREATORS = """
+    (SELECT group_concat(c.name, ' ')
+     FROM item_creators ic JOIN creators c ON c.id = ic.creator_id
+     WHERE ic.item_id = {item})
+"""
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS item_search USING fts5(title, tags, creators)",
+    """
+    CREATE TRIGGER IF NOT EXISTS items_search_insert AFTER INSERT ON items BEGIN
+        INSERT INTO item_search (rowid, title, tags, creators)
+        VALUES (NEW.id, NEW.title, '', '');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_search_update AFTER UPDATE OF title ON items BEGIN
+        UPDATE item_search SET title = NEW.title WHERE rowid = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_search_delete AFTER DELETE ON items BEGIN
+        DELETE FROM item_search WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS item_tags_search_insert AFTER INSERT ON item_tags BEGIN
+        UPDATE item_search SET tags = {SQLITE_TAGS.format(item="NEW.item_id")}
+        WHERE rowid = NEW.item_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS item_tags_search_delete AFTER DELETE ON item_tags BEGIN
+        UPDATE item_search SET tags = {SQLITE_TAGS.format(item="OLD.item_id")}
+        WHERE rowid = OLD.item_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS item_creators_search_insert AFTER INSERT ON item_creators BEGIN
+        UPDATE item_search SET creators = {SQLITE_CREATORS.format(item="NEW.item_id")}
+        WHERE rowid = NEW.item_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS item_creators_search_delete AFTER DELETE ON item_creators BEGIN
+        UPDATE item_search SET creators = {SQLITE_CREATORS.format(item="OLD.item_id")}
+        WHERE rowid = OLD.item_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tags_search_update AFTER UPDATE OF name ON tags BEGIN
+        UPDATE item_search SET tags = {SQLITE_TAGS.format(item="item_search.rowid")}
+        WHERE rowid IN (SELECT item_id FROM item_tags WHERE tag_id = NEW.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS creators_search_update AFTER UPDATE OF name ON creators BEGIN
+        UPDATE item_search SET creators = {SQLITE_CREATORS.format(item="item_search.rowid")}
+        WHERE rowid IN (SELECT item_id FROM item_creators WHERE creator_id = NEW.id);
+    END
+    """,
+]
+
+SQLITE_DROP = ["DROP TABLE IF EXISTS item_search"]
+
+for statement in POSTGRES_DDL:
+    event.listen(db.metadata, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in POSTGRES_DROP:
+    event.listen(db.metadata, "before_drop", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_DDL:
+    event.listen(db.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in SQLITE_DROP:
+    event.listen(db.metadata, "before_drop", DDL(statement).execute_if(dialect="sqlite"))
+
+# Lower score ranks first on both backends: bm25() is already negative
+# for better matches, and the Postgres rank is negated to match.
+POSTGRES_SEARCH = """
+    SELECT s.item_id AS id, -ts_rank(s.document, q.query)::float8 AS score
+    FROM item_search s, to_tsquery('simple', :query) AS q (query)
+    WHERE s.user_id = :user_id
+      AND s.document @@ q.query
+      {after}
+    ORDER BY score, s.item_id
+    LIMIT :limit
+"""
+
+POSTGRES_AFTER = """
+      AND (-ts_rank(s.document, q.query)::float8, s.item_id) > (:after_score, :after_id)
+"""
+
+SQLITE_SEARCH = """
+    SELECT id, score FROM (
+        SELECT i.id AS id, bm25(item_search, 10.0, 5.0, 5.0) AS score
+        FROM item_search
+        JOIN items i ON i.id = item_search.rowid
+        WHERE item_search MATCH :query
+          AND i.user_id = :user_id
+    )
+    WHERE 1 = 1 {after}
+    ORDER BY score, id
+    LIMIT :limit
+"""
+
+SQLITE_AFTER = """
+      AND (score, id) > (:after_score, :after_id)
+"""
+
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def search_terms(q):
+    """Split free text into words; each is matched as a prefix."""
+    return WORD.findall(q or "")[:10]
+
+
+def build_query(dialect, terms):
+    if dialect == "postgresql":
+        return " & ".join(f"{term}:*" for term in terms)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_item_ids(user_id, terms):
+    """Return one page of ``(item_id, score)`` matches, best first, plus
+    the cursor for the next page."""
+    limit, after = page_args(float)
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        sql, after_sql = POSTGRES_SEARCH, POSTGRES_AFTER
+    elif dialect == "sqlite":
+        sql, after_sql = SQLITE_SEARCH, SQLITE_AFTER
+    else:
+        raise PaginationError(f"Search is not supported on {dialect}")
+
+    params = {
+        "query": build_query(dialect, terms),
+        "user_id": user_id,
+        "limit": limit + 1,
+    }
+    if after is not None:
+        params["after_score"], params["after_id"] = after
+
+    rows = db.session.execute(
+        text(sql.format(after=after_sql if after is not None else "")),
+        params,
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].score, rows[-1].id])
+
+    return [(row.id, row.score) for row in rows], limit, next_cursor
@@ -1,3 +1,25 @@
+"""Seed the database.
+
+    python -m server.seed
+    python -m server.seed --users 1000 --items-per-user 1000 --reviews 1.5 --seed 7
+
+Without ``--users`` it loads the small demo data set. With it, it
+generates users of ``--items-per-user`` items each. Tag and creator
+popularity follow a Zipf curve, each user files most items under a few
+favourite categories, review counts per item are geometric around
+``--reviews`` and ratings lean positive. The same ``--seed`` always
+produces the same rows. Existing data is cleared first.
+"""
+
+import io
+import csv
+import time
+import random
+import argparse
+import itertools
+
+from sqlalchemy import delete, func, insert, select, text
+
 from .app import app
 from .models import (
     db,
@@ -9,24 +31,267 @@ from .models import (
     Review,
     ItemTag,
     ItemCreator,
+    ExportJob,
+    UserCount,
 )
+from .ratings import rebuild_rating_aggregates
+from .stats import add_counts, item_counts, rebuild_user_counts
+from .versions import TAGS_SCOPE, CREATORS_SCOPE, bump, bump_all_users
 
+SEED_BATCH_SIZE = 10000
 
-def run_seed():
-    with app.app_context():
-        print("Clearing existing data...")
+CATEGORY_NAMES = ("Book", "Game", "Film", "Series", "Album", "Podcast", "Comic", "Board Game")
+TITLE_WORDS = (
+    "Dark", "Souls", "Wheel", "Time", "Night", "City", "Star", "Ocean",
+    "Legend", "Witcher", "Empire", "Dragon", "Silent", "Garden", "Iron",
+    "Crown", "Shadow", "River", "Winter", "Storm",
+)
+TAG_WORDS = (
+    "Fantasy", "RPG", "Classic", "Adventure", "Horror", "Sci-Fi", "Mystery",
+    "Romance", "Strategy", "Indie", "Noir", "Comedy", "Drama", "Thriller",
+    "Historical", "Co-op", "Open World", "Documentary", "Cozy", "Epic",
+)
+FIRST_NAMES = (
+    "Ada", "Ben", "Chen", "Dana", "Emeka", "Farah", "Goro", "Hana", "Ivan",
+    "Jun", "Kofi", "Lena", "Mateo", "Nadia", "Omar", "Priya", "Quinn", "Rosa",
+)
+LAST_NAMES = (
+    "Abe", "Brooks", "Costa", "Diaz", "Eriksen", "Fujita", "Garcia", "Haddad",
+    "Ito", "Jensen", "Khan", "Lopez", "Moreau", "Nakamura", "Okafor", "Park",
+)
+REVIEW_TEXTS = (
+    "Loved it.", "Not for me.", "Solid, would revisit.", "A classic.",
+    "Better than expected.", "Slow start, great ending.", None,
+)
+# Share of reviews giving 1 to 5 stars.
+RATING_WEIGHTS = (5, 8, 17, 35, 35)
+TAGS_PER_ITEM_WEIGHTS = (10, 25, 30, 20, 10, 5)
+
+
+def zipf_weights(n, exponent=1.1):
+    """Cumulative weights for ``rng.choices`` where rank ``k`` is
+    ``1 / k ** exponent`` as likely as rank 1."""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+
+def pick_distinct(rng, population, cum_weights, k):
+    """Up to ``k`` distinct weighted picks from ``population``."""
+    if k <= 0:
+        return []
+    picks = dict.fromkeys(rng.choices(population, cum_weights=cum_weights, k=k * 2))
+    return list(picks)[:k]
+
+
+def geometric(rng, mean):
+    """Non-negative count with the given mean: mostly 0 or 1, with a
+    long tail of heavily reviewed items."""
+    if mean <= 0:
+        return 0
+    stop = 1 / (1 + mean)
+    count = 0
+    while rng.random() > stop:
+        count += 1
+    return count
+
+
+def numbered_names(words, n):
+    """``n`` distinct names built from ``words``, plain words first."""
+    names = list(words[:n])
+    for number in itertools.count(2):
+        if len(names) >= n:
+            break
+        names.extend(f"{word} {number}" for word in words[:n - len(names)])
+    return names
+
+
+def creator_names(n):
+    pairs = [f"{first} {last}" for last in LAST_NAMES for first in FIRST_NAMES]
+    return numbered_names(pairs, n)
+
+
+def next_id(model):
+    return (db.session.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def load_rows(model, columns, rows):
+    """Bulk-load ``rows`` (tuples in ``columns`` order) into ``model``'s
+    table: ``COPY`` on Postgres with psycopg2, batched ``insert()``
+    everywhere else."""
+    if not rows:
+        return
+    bind = db.session.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert(
+            f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        return
+    db.session.execute(insert(model), [dict(zip(columns, row)) for row in rows])
+
+
+def reset_sequences(*models):
+    """Move Postgres id sequences past the ids assigned by ``generate``."""
+    if db.session.get_bind().dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"coalesce((SELECT max(id) FROM {table}), 0) + 1, false)"
+        ))
 
-        ItemTag.query.delete()
-        ItemCreator.query.delete()
-        Review.query.delete()
-        Item.query.delete()
-        Tag.query.delete()
-        Creator.query.delete()
-        Category.query.delete()
-        User.query.delete()
 
+def clear_data():
+    """Delete all application rows. ``data_versions`` is kept and bumped
+    after loading, so ETags issued for the old data stop matching."""
+    models = (
+        UserCount, ItemTag, ItemCreator, Review, ExportJob, Item, Tag, Creator, Category, User,
+    )
+    if db.session.get_bind().dialect.name == "postgresql":
+        tables = ", ".join(model.__tablename__ for model in models)
+        db.session.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    else:
+        for model in models:
+            db.session.execute(delete(model))
+    db.session.commit()
+
+
+def generate(
+    users,
+    items_per_user,
+    reviews_per_item=1.0,
+    tags=500,
+    creators=2000,
+    seed=0,
+    batch_size=SEED_BATCH_SIZE,
+):
+    """Bulk-load a synthetic data set; returns row counts per table.
+
+    Ids are assigned here rather than by the database, so items, links
+    and reviews can be loaded with ``COPY`` without reading ids back.
+    User ``n`` is ``user{n}@example.com`` with password ``password``.
+    """
+    rng = random.Random(seed)
+    counts = {
+        "users": users,
+        "categories": 0,
+        "tags": tags,
+        "creators": creators,
+        "items": 0,
+        "item_tags": 0,
+        "item_creators": 0,
+        "reviews": 0,
+    }
+
+    first_user = next_id(User)
+    user_ids = list(range(first_user, first_user + users))
+    load_rows(User, ("id", "username", "first_name", "last_name", "email", "password"), [
+        (
+            user_id,
+            f"user{n}",
+            FIRST_NAMES[n % len(FIRST_NAMES)],
+            LAST_NAMES[n % len(LAST_NAMES)],
+            f"user{n}@example.com",
+            "password",
+        )
+        for n, user_id in enumerate(user_ids)
+    ])
+
+    # Each user has a few categories, listed most-used first.
+    category_id = next_id(Category)
+    user_categories = []
+    category_rows = []
+    for user_id in user_ids:
+        names = rng.sample(CATEGORY_NAMES, rng.randint(2, len(CATEGORY_NAMES)))
+        ids = list(range(category_id, category_id + len(names)))
+        category_id += len(names)
+        user_categories.append((ids, zipf_weights(len(ids), 1.5)))
+        category_rows.extend((id_, name, user_id) for id_, name in zip(ids, names))
+    load_rows(Category, ("id", "name", "user_id"), category_rows)
+    counts["categories"] = len(category_rows)
+
+    first_tag = next_id(Tag)
+    tag_ids = list(range(first_tag, first_tag + tags))
+    load_rows(Tag, ("id", "name"), list(zip(tag_ids, numbered_names(TAG_WORDS, tags))))
+
+    first_creator = next_id(Creator)
+    creator_ids = list(range(first_creator, first_creator + creators))
+    load_rows(Creator, ("id", "name"), list(zip(creator_ids, creator_names(creators))))
+    db.session.commit()
+
+    tag_weights = zipf_weights(tags)
+    creator_weights = zipf_weights(creators)
+    tag_counts = range(len(TAGS_PER_ITEM_WEIGHTS))
+    ratings = range(1, 6)
+
+    n_items = users * items_per_user
+    item_id = first_item = next_id(Item)
+    for start in range(0, n_items, batch_size):
+        items, item_tags, item_creators, reviews = [], [], [], []
+
+        for n in range(start, min(start + batch_size, n_items)):
+            owner = n // items_per_user
+            category_ids, category_weights = user_categories[owner]
+
+            rating_count = rating_sum = 0
+            for _ in range(geometric(rng, reviews_per_item)):
+                rating = rng.choices(ratings, weights=RATING_WEIGHTS)[0]
+                if rng.random() < 0.05:
+                    rating = None
+                else:
+                    rating_count += 1
+                    rating_sum += rating
+                reviews.append((rating, rng.choice(REVIEW_TEXTS), rng.choice(user_ids), item_id))
+
+            items.append((
+                item_id,
+                f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_WORDS)} {n}",
+                user_ids[owner],
+                rng.choices(category_ids, cum_weights=category_weights)[0],
+                f"https://example.com/{n}.jpg" if rng.random() < 0.8 else None,
+                rating_count,
+                rating_sum,
+            ))
+            k = rng.choices(tag_counts, weights=TAGS_PER_ITEM_WEIGHTS)[0]
+            item_tags.extend(
+                (item_id, tag_id) for tag_id in pick_distinct(rng, tag_ids, tag_weights, k)
+            )
+            item_creators.extend(
+                (item_id, creator_id)
+                for creator_id in pick_distinct(rng, creator_ids, creator_weights, rng.randint(1, 2))
+            )
+            item_id += 1
+
+        load_rows(Item, (
+            "id", "title", "user_id", "category_id", "image_url", "rating_count", "rating_sum",
+        ), items)
+        load_rows(ItemTag, ("item_id", "tag_id"), item_tags)
+        load_rows(ItemCreator, ("item_id", "creator_id"), item_creators)
+        load_rows(Review, ("rating", "text", "user_id", "item_id"), reviews)
         db.session.commit()
 
+        counts["items"] += len(items)
+        counts["item_tags"] += len(item_tags)
+        counts["item_creators"] += len(item_creators)
+        counts["reviews"] += len(reviews)
+
+    add_counts(item_counts(Item.id >= first_item))
+    reset_sequences(User, Category, Tag, Creator, Item)
+    bump_all_users()
+    bump(TAGS_SCOPE, CREATORS_SCOPE)
+    db.session.commit()
+    return counts
+
+
+def run_seed():
+    with app.app_context():
+        print("Clearing existing data...")
+        clear_data()
+
         print("Creating seed data...")
 
         jack = User(
@@ -106,9 +371,51 @@ def run_seed():
             review1,
             review2,
         ])
+        db.session.flush()
 
+        rebuild_rating_aggregates()
+        rebuild_user_counts()
+        bump_all_users()
+        bump(TAGS_SCOPE, CREATORS_SCOPE)
         db.session.commit()
 
 
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=None)
+    parser.add_argument("--items-per-user", type=int, default=100)
+    parser.add_argument("--reviews", type=float, default=1.0, help="mean reviews per item")
+    parser.add_argument("--tags", type=int, default=500)
+    parser.add_argument("--creators", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.users is None:
+        run_seed()
+        return
+
+    with app.app_context():
+        print("Clearing existing data...")
+        clear_data()
+
+        print(f"Generating {args.users * args.items_per_user} items...")
+        started = time.perf_counter()
+        counts = generate(
+            args.users,
+            args.items_per_user,
+            reviews_per_item=args.reviews,
+            tags=args.tags,
+            creators=args.creators,
+            seed=args.seed,
+            batch_size=args.batch_size,
+        )
+        elapsed = time.perf_counter() - started
+
+    for table, count in counts.items():
+        print(f"  {table:<14} {count:>10}")
+    print(f"Loaded in {elapsed:.1f}s")
+
+
 if __name__ == "__main__":
-    run_seed()
\ No newline at end of file
+    main()
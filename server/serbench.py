@@ -0,0 +1,110 @@
+"""Measure the cost of turning items into a JSON response body.
+
+    python -m server.serbench --items 10000
+
+Compares the old path (ORM objects with selectinload, a per-object dict
+builder and Flask's stdlib encoder) with row-based ``serialize_items``
+and the orjson provider. Times are per ``--items`` items, best of
+``--repeat`` runs.
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import selectinload
+
+from .app import create_app
+from .seed import generate
+from .models import db, Item
+from .serializers import item_query, serialize_items
+from .json_provider import OrjsonProvider, orjson
+
+
+def orm_item_to_dict(item):
+    """The ORM-object serializer list views used before ``serialize_items``."""
+    return {
+        "id": item.id,
+        "title": item.title,
+        "user_id": item.user_id,
+        "category_id": item.category_id,
+        "category_name": item.category.name if item.category else None,
+        "image_url": item.image_url,
+        "tags": [t.name for t in item.tags],
+        "creators": [c.name for c in item.creators],
+        "rating_count": item.rating_count,
+        "rating_sum": item.rating_sum,
+        "avg_rating": item.avg_rating,
+    }
+
+
+def build_orm(user_id):
+    items = (
+        Item.query.options(
+            selectinload(Item.category),
+            selectinload(Item.tags),
+            selectinload(Item.creators),
+        )
+        .filter_by(user_id=user_id)
+        .order_by(Item.title, Item.id)
+        .all()
+    )
+    return [orm_item_to_dict(item) for item in items]
+
+
+def build_rows(user_id):
+    rows = item_query().filter(Item.user_id == user_id).order_by(Item.title, Item.id).all()
+    return serialize_items(rows)
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "medialog-serbench.db")
+    if os.path.exists(path):
+        os.remove(path)
+
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+        "METRICS_ENABLED": False,
+        "EXPORT_WORKERS_AUTOSTART": False,
+    })
+    encoders = [("stdlib json", DefaultJSONProvider(app))]
+    if orjson is not None:
+        encoders.append(("orjson", OrjsonProvider(app)))
+
+    with app.app_context():
+        db.create_all()
+        generate(1, args.items)
+        user_id = db.session.scalar(db.select(Item.user_id).limit(1))
+
+        print(f"{args.items} items, best of {args.repeat}")
+        for label, build in (("ORM objects", build_orm), ("row tuples", build_rows)):
+            build_ms, dicts = best_of(args.repeat, lambda: build(user_id))
+            for encoder_label, provider in encoders:
+                encode_ms, body = best_of(args.repeat, lambda: provider.response(dicts).get_data())
+                print(
+                    f"  {label:<12} + {encoder_label:<12} build {build_ms:8.1f}ms  "
+                    f"encode {encode_ms:7.1f}ms  total {build_ms + encode_ms:8.1f}ms  "
+                    f"({len(body) / 1024:.0f} KiB)"
+                )
+
+
+if __name__ == "__main__":
+    main()
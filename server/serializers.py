@@ -0,0 +1,278 @@
+from functools import lru_cache
+
+from sqlalchemy import select
+
+from .models import db, Category, Item, Tag, Creator, Review, ItemTag, ItemCreator
+
+# Ids per IN (...) when batch-loading relations; stays well under
+# SQLite's bound-parameter limit for very large lists.
+LOOKUP_CHUNK = 1000
+
+# Item fields in the default response, and the column(s) each reads.
+ITEM_FIELD_COLUMNS = {
+    "id": (),
+    "title": (),
+    "user_id": (Item.user_id,),
+    "category_id": (Item.category_id,),
+    "category_name": (Category.name.label("category_name"),),
+    "image_url": (Item.image_url,),
+    "tags": (),
+    "creators": (),
+    "rating_count": (Item.rating_count,),
+    "rating_sum": (Item.rating_sum,),
+    "avg_rating": (Item.rating_count, Item.rating_sum),
+}
+ITEM_FIELDS = tuple(ITEM_FIELD_COLUMNS)
+ITEM_INCLUDES = ("tags", "creators", "reviews", "category")
+
+REVIEW_COLUMNS = (Review.id, Review.rating, Review.text, Review.user_id, Review.item_id)
+
+
+class FieldsetError(ValueError):
+    pass
+
+
+def review_to_dict(review):
+    return {
+        "id": review.id,
+        "rating": review.rating,
+        "text": review.text,
+        "user_id": review.user_id,
+        "item_id": review.item_id,
+    }
+
+def user_to_dict(user):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "email": user.email,
+    }
+
+def category_to_dict(category):
+    return {
+        "id": category.id,
+        "name": category.name,
+        "user_id": category.user_id,
+    }
+
+def tag_to_dict(tag):
+    return {
+        "id": tag.id,
+        "name": tag.name,
+    }
+
+def creator_to_dict(creator):
+    return {
+        "id": creator.id,
+        "name": creator.name,
+    }
+
+def export_job_to_dict(job):
+    return {
+        "id": job.id,
+        "user_id": job.user_id,
+        "email": job.email,
+        "status": job.status,
+        "attempts": job.attempts,
+        "total_rows": job.total_rows,
+        "rows_exported": job.rows_exported,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat(),
+    }
+
+
+def split_param(value):
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def parse_item_fieldset(fields=None, include=None):
+    """Validate ``?fields=`` and ``?include=`` values.
+
+    Returns ``(fields, includes)`` as sorted tuples. Without ``fields``
+    every default field is returned; ``id`` is always returned. ``tags``
+    and ``creators`` may be asked for either way.
+    """
+    includes = set(split_param(include or ""))
+    unknown = includes.difference(ITEM_INCLUDES)
+    if unknown:
+        raise FieldsetError(f"Unknown include: {', '.join(sorted(unknown))}")
+
+    if fields is None:
+        return ITEM_FIELDS, tuple(sorted(includes))
+
+    chosen = set(split_param(fields))
+    unknown = chosen.difference(ITEM_FIELDS)
+    if unknown:
+        raise FieldsetError(f"Unknown field: {', '.join(sorted(unknown))}")
+
+    includes |= chosen & {"tags", "creators"}
+    chosen = (chosen - {"tags", "creators"}) | {"id"}
+    return tuple(sorted(chosen)), tuple(sorted(includes))
+
+
+class ItemSerializer:
+    """Selects only the columns a fieldset needs and batch-loads only the
+    relations it includes. Build through ``item_serializer`` so each
+    fieldset is compiled once."""
+
+    def __init__(self, fields, includes):
+        self.includes = frozenset(includes) | (
+            frozenset(fields) & {"tags", "creators"}
+        )
+
+        # id and title lead every row: they are the keyset cursor.
+        columns = [Item.id, Item.title]
+        for field in fields:
+            for column in ITEM_FIELD_COLUMNS[field]:
+                if not any(column is c for c in columns):
+                    columns.append(column)
+
+        self.join_category = "category_name" in fields or "category" in self.includes
+        if "category" in self.includes:
+            columns += [
+                Category.name.label("category_object_name"),
+                Category.user_id.label("category_user_id"),
+            ]
+            if not any(c is Item.category_id for c in columns):
+                columns.append(Item.category_id)
+
+        self.columns = tuple(columns)
+        position = {column.key: index for index, column in enumerate(columns)}
+
+        self.slots = tuple(
+            (field, position[field])
+            for field in fields
+            if field in position
+        )
+        self.avg_rating = (
+            (position["rating_count"], position["rating_sum"])
+            if "avg_rating" in fields else None
+        )
+        self.category = (
+            (position["category_id"], position["category_object_name"], position["category_user_id"])
+            if "category" in self.includes else None
+        )
+
+    def query(self):
+        query = db.session.query(*self.columns)
+        if self.join_category:
+            query = query.outerjoin(Category, Category.id == Item.category_id)
+        return query
+
+    def serialize(self, rows):
+        if not rows:
+            return []
+
+        item_ids = [row[0] for row in rows]
+        tags = creators = reviews = None
+        if "tags" in self.includes:
+            tags = names_by_item(ItemTag.tag_id, Tag, item_ids)
+        if "creators" in self.includes:
+            creators = names_by_item(ItemCreator.creator_id, Creator, item_ids)
+        if "reviews" in self.includes:
+            reviews = reviews_by_item(item_ids)
+
+        slots = self.slots
+        results = []
+        for row in rows:
+            item = {field: row[index] for field, index in slots}
+            item_id = row[0]
+
+            if self.avg_rating is not None:
+                count, total = row[self.avg_rating[0]], row[self.avg_rating[1]]
+                item["avg_rating"] = round(total / count, 2) if count else None
+            if self.category is not None:
+                category_id, name, user_id = (row[i] for i in self.category)
+                item["category"] = (
+                    {"id": category_id, "name": name, "user_id": user_id}
+                    if category_id is not None else None
+                )
+            if tags is not None:
+                item["tags"] = tags.get(item_id, [])
+            if creators is not None:
+                item["creators"] = creators.get(item_id, [])
+            if reviews is not None:
+                item["reviews"] = reviews.get(item_id, [])
+
+            results.append(item)
+        return results
+
+    def load(self, item_ids):
+        """Items for ``item_ids`` ordered by id; missing ids are skipped."""
+        rows = self.query().filter(Item.id.in_(item_ids)).order_by(Item.id).all()
+        return self.serialize(rows)
+
+    def lookup(self, item_ids, user_id=None):
+        """``(items, missing)`` for ``item_ids``: the items found and the
+        requested ids that don't exist, both in ``item_ids`` order. With
+        ``user_id``, other users' items count as missing."""
+        query = self.query().filter(Item.id.in_(item_ids))
+        if user_id is not None:
+            query = query.filter(Item.user_id == user_id)
+        rows = {row[0]: row for row in query}
+        return (
+            self.serialize([rows[item_id] for item_id in item_ids if item_id in rows]),
+            [item_id for item_id in item_ids if item_id not in rows],
+        )
+
+
+@lru_cache(maxsize=128)
+def item_serializer(fields=ITEM_FIELDS, includes=()):
+    return ItemSerializer(fields, includes)
+
+
+def names_by_item(link_column, target, item_ids):
+    """Map item id to the names of its tags or creators, where
+    ``link_column`` is e.g. ``ItemTag.tag_id`` and ``target`` is ``Tag``."""
+    link = link_column.class_
+    names = {}
+    for start in range(0, len(item_ids), LOOKUP_CHUNK):
+        rows = db.session.execute(
+            select(link.item_id, target.name)
+            .join(target, target.id == link_column)
+            .where(link.item_id.in_(item_ids[start:start + LOOKUP_CHUNK]))
+        )
+        for item_id, name in rows:
+            names.setdefault(item_id, []).append(name)
+    return names
+
+
+def reviews_by_item(item_ids):
+    reviews = {}
+    for start in range(0, len(item_ids), LOOKUP_CHUNK):
+        rows = db.session.execute(
+            select(*REVIEW_COLUMNS)
+            .where(Review.item_id.in_(item_ids[start:start + LOOKUP_CHUNK]))
+            .order_by(Review.id)
+        )
+        for review_id, rating, text, user_id, item_id in rows:
+            reviews.setdefault(item_id, []).append({
+                "id": review_id,
+                "rating": rating,
+                "text": text,
+                "user_id": user_id,
+                "item_id": item_id,
+            })
+    return reviews
+
+
+def item_query():
+    """Items as plain rows for ``serialize_items``, with every default
+    field. Skips the ORM identity map entirely."""
+    return item_serializer().query()
+
+
+def serialize_items(rows):
+    return item_serializer().serialize(rows)
+
+
+def load_item_dicts(item_ids):
+    return item_serializer().load(item_ids)
+
+
+def load_item_dict(item_id):
+    items = load_item_dicts([item_id])
+    return items[0] if items else None
@@ -0,0 +1,199 @@
+from sqlalchemy import String, delete, exists, func, literal, select, true, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import (
+    db, User, Category, Item, Tag, Creator, Review, ItemTag, ItemCreator, UserCount,
+)
+
+TOP_LIMIT = 10
+RATINGS = range(1, 6)
+
+# The user_counts kind and target model for each item link column.
+LINKS = {"tag_id": ("tag", Tag), "creator_id": ("creator", Creator)}
+
+
+def add_counts(rows):
+    """Add ``rows``, a select of ``(user_id, kind, key_id, total)``, to
+    the stored counts. Totals may be negative; rows for one key are
+    summed first."""
+    rows = rows.subquery()
+    total = func.sum(rows.c.total)
+    summed = (
+        select(rows.c.user_id, rows.c.kind, rows.c.key_id, total)
+        # SQLite needs a WHERE clause before an upsert's ON CONFLICT.
+        .where(true())
+        .group_by(rows.c.user_id, rows.c.kind, rows.c.key_id)
+        .having(total != 0)
+    )
+
+    dialect = db.session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(UserCount).from_select(["user_id", "kind", "key_id", "total"], summed)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=["user_id", "kind", "key_id"],
+        set_={"total": UserCount.total + stmt.excluded.total},
+    ))
+
+
+def count_columns(kind, key_id, total):
+    return (literal(kind, String).label("kind"), key_id.label("key_id"), total.label("total"))
+
+
+def item_counts(condition, sign=1):
+    """What the items matching ``condition`` add to their owners'
+    counts, times ``sign``; pass ``sign=-1`` before deleting them."""
+    total = func.count() * sign
+
+    def linked(column):
+        kind, _ = LINKS[column.key]
+        link = column.class_
+        return (
+            select(Item.user_id, *count_columns(kind, column, total))
+            .join(Item, Item.id == link.item_id)
+            .where(condition)
+            .group_by(Item.user_id, column)
+        )
+
+    rating = func.coalesce(Review.rating, 0)
+    return union_all(
+        select(Item.user_id, *count_columns("category", Item.category_id, total))
+        .where(condition)
+        .group_by(Item.user_id, Item.category_id),
+        linked(ItemTag.tag_id),
+        linked(ItemCreator.creator_id),
+        select(Item.user_id, *count_columns("rating", rating, total))
+        .join(Item, Item.id == Review.item_id)
+        .where(condition)
+        .group_by(Item.user_id, rating),
+    )
+
+
+def link_counts(column, item_ids, ids, sign):
+    """The count change from linking (``sign=1``) or unlinking
+    (``sign=-1``) every item in ``item_ids`` and every id in ``ids``.
+    Only links that will actually be added or removed are counted, so
+    call it before writing them."""
+    kind, target = LINKS[column.key]
+    link = column.class_
+    linked = exists().where(link.item_id == Item.id, column == target.id)
+    return (
+        select(Item.user_id, *count_columns(kind, target.id, func.count() * sign))
+        .join(target, target.id.in_(ids))
+        .where(Item.id.in_(item_ids), linked if sign < 0 else ~linked)
+        .group_by(Item.user_id, target.id)
+    )
+
+
+def add_category_count(user_id, category_id, total):
+    add_counts(select(
+        literal(user_id).label("user_id"),
+        *count_columns("category", literal(category_id), literal(total)),
+    ))
+
+
+def add_review_counts(item_id, changes):
+    """Apply ``(rating, total)`` changes to the review histogram of
+    ``item_id``'s owner; unrated reviews have rating None."""
+    add_counts(union_all(*(
+        select(Item.user_id, *count_columns("rating", literal(rating or 0), literal(total)))
+        .where(Item.id == item_id)
+        for rating, total in changes
+    )))
+
+
+def rebuild_user_counts():
+    """Recompute every stored count from the items, links and reviews."""
+    db.session.execute(delete(UserCount))
+    add_counts(item_counts(true()))
+
+
+def top_linked(kind, target, user_id):
+    """The ``TOP_LIMIT`` tags or creators on most of a user's items."""
+    top = (
+        select(UserCount.key_id.label("id"), UserCount.total)
+        .where(UserCount.user_id == user_id, UserCount.kind == kind, UserCount.total > 0)
+        .order_by(UserCount.total.desc(), UserCount.key_id)
+        .limit(TOP_LIMIT)
+        .subquery()
+    )
+    return select(
+        literal(kind, String).label("kind"), top.c.id, target.name, top.c.total,
+    ).join(top, top.c.id == target.id)
+
+
+def user_counts(user_id, kind):
+    return (
+        select(UserCount.key_id, UserCount.total)
+        .where(UserCount.user_id == user_id, UserCount.kind == kind)
+        .subquery()
+    )
+
+
+def stats_query(user_id):
+    """Every row behind ``user_stats`` as one ``UNION ALL`` of
+    ``(kind, id, name, count)`` rows, read from the stored counts."""
+    counts = user_counts(user_id, "category")
+    categories = (
+        select(
+            literal("category", String).label("kind"),
+            Category.id,
+            Category.name,
+            func.coalesce(counts.c.total, 0),
+        )
+        .outerjoin(counts, counts.c.key_id == Category.id)
+        .where(Category.user_id == user_id)
+    )
+    ratings = user_counts(user_id, "rating")
+    return union_all(
+        categories,
+        top_linked("tag", Tag, user_id),
+        top_linked("creator", Creator, user_id),
+        select(
+            literal("rating", String).label("kind"),
+            ratings.c.key_id,
+            literal(None, String).label("name"),
+            ratings.c.total,
+        ),
+    )
+
+
+def ranked(rows):
+    return [
+        {"id": id_, "name": name, "item_count": count}
+        for id_, name, count in sorted(rows, key=lambda row: (-row[2], row[1]))
+    ]
+
+
+def user_stats(user_id):
+    """Library statistics for one user, or None if the user doesn't exist.
+
+    Item counts per category, the most used tags and creators, and the
+    rating histogram of reviews on the user's items, read from the
+    stored counts in one query.
+    """
+    rows = {"category": [], "tag": [], "creator": [], "rating": []}
+    for kind, id_, name, count in db.session.execute(stats_query(user_id)):
+        rows[kind].append((id_, name, count))
+
+    # Every item has a category, so a user without categories has no
+    # items; only then is it worth checking that the user exists.
+    if not rows["category"] and db.session.get(User, user_id) is None:
+        return None
+
+    ratings = {rating: count for rating, _, count in rows["rating"]}
+    rated = sum(ratings.get(rating, 0) for rating in RATINGS)
+    rating_sum = sum(rating * ratings.get(rating, 0) for rating in RATINGS)
+
+    return {
+        "user_id": user_id,
+        "item_count": sum(count for _, _, count in rows["category"]),
+        "categories": ranked(rows["category"]),
+        "top_tags": ranked(rows["tag"]),
+        "top_creators": ranked(rows["creator"]),
+        "review_count": sum(ratings.values()),
+        "rated_review_count": rated,
+        "average_rating": round(rating_sum / rated, 2) if rated else None,
+        "rating_histogram": [
+            {"rating": rating, "count": ratings.get(rating, 0)} for rating in RATINGS
+        ],
+    }
@@ -0,0 +1,134 @@
+from functools import wraps
+
+from flask import current_app, make_response, request
+from sqlalchemy import String, cast, exists, insert, literal, select, true, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import db, DataVersion, Item, User
+
+TAGS_SCOPE = "tags"
+CREATORS_SCOPE = "creators"
+
+
+def user_scope(user_id):
+    """Scope covering a user's items and categories."""
+    return f"user:{user_id}"
+
+
+def bump(*scopes):
+    """Advance the version of each scope inside the current transaction."""
+    cache = current_app.extensions.get("read_cache")
+
+    for scope in dict.fromkeys(scopes):
+        if cache is not None:
+            cache.invalidate(scope)
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(DataVersion).values(scope=scope, version=1)
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=[DataVersion.scope],
+                set_={"version": DataVersion.version + 1},
+            ))
+            continue
+
+        updated = db.session.execute(
+            update(DataVersion)
+            .where(DataVersion.scope == scope)
+            .values(version=DataVersion.version + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not updated:
+            db.session.add(DataVersion(scope=scope, version=1))
+
+
+def bump_all_users():
+    """Bump every user's scope, creating the version row of users who
+    have never had one, so no cached ETag survives."""
+    scope = (literal(user_scope("")) + cast(User.id, String)).label("scope")
+    # SQLite needs a WHERE clause before an upsert's ON CONFLICT.
+    scopes = select(scope, literal(1).label("version")).where(true())
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_ = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert_(DataVersion).from_select(["scope", "version"], scopes)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[DataVersion.scope],
+            set_={"version": DataVersion.version + 1},
+        ))
+        return
+
+    db.session.execute(
+        update(DataVersion)
+        .where(DataVersion.scope.startswith(user_scope("")))
+        .values(version=DataVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(insert(DataVersion).from_select(
+        ["scope", "version"],
+        scopes.where(~exists().where(DataVersion.scope == scope)),
+    ))
+
+
+def bump_item_owners(item_ids):
+    user_ids = db.session.scalars(
+        select(Item.user_id).where(Item.id.in_(item_ids)).distinct()
+    )
+    bump(*(user_scope(user_id) for user_id in user_ids))
+
+
+def current_version(scope):
+    version = db.session.scalar(
+        select(DataVersion.version).where(DataVersion.scope == scope)
+    )
+    return version or 0
+
+
+def versioned(scope_for_request, cache=False):
+    """Serve a list view with an ETag built from a version counter.
+
+    ``scope_for_request`` picks the scope from the request, or returns
+    None to skip conditional handling (e.g. when a required argument is
+    missing). A matching ``If-None-Match`` gets a 304 without running
+    the view. With ``cache=True`` and a read cache configured, 200
+    bodies are kept per version and URL and replayed without the view;
+    ``cache`` may also name another cache in ``app.extensions``.
+    """
+    cache_name = "read_cache" if cache is True else cache
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            scope = scope_for_request()
+            if scope is None:
+                return view(*args, **kwargs)
+
+            etag = f"{scope}:{current_version(scope)}"
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+
+            read_cache = current_app.extensions.get(cache_name) if cache_name else None
+            key = f"{etag}|{request.full_path}"
+
+            if read_cache is not None:
+                body = read_cache.get(key)
+                if body is not None:
+                    response = current_app.response_class(body, mimetype="application/json")
+                    response.set_etag(etag)
+                    return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                if read_cache is not None and response.mimetype == "application/json":
+                    read_cache.set(key, response.get_data(), scope)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,57 @@
+import os
+
+# Importing server.app builds its module-level app: it needs a secret
+# key and must not start export workers against the default database.
+os.environ.setdefault("EXPORT_WORKERS_AUTOSTART", "false")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+import pytest
+from sqlalchemy import event
+
+from server.app import create_app
+from server.models import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "MAIL_TRANSPORT": "fake",
+        "READ_CACHE_BACKEND": None,
+        "METRICS_ENABLED": False,
+        "COMPRESSION_ENABLED": False,
+        "EXPORT_WORKERS_AUTOSTART": False,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class StatementRecorder:
+    """Collects ``(statement, parameters)`` for every SQL statement run
+    on the app's engine while recording."""
+
+    def __init__(self):
+        self.statements = []
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def __len__(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def recorder(app):
+    recorder = StatementRecorder()
+    event.listen(db.engine, "before_cursor_execute", recorder.on_execute)
+    yield recorder
+    event.remove(db.engine, "before_cursor_execute", recorder.on_execute)
@@ -0,0 +1,62 @@
+"""Export workers record real progress and drop jobs reclaimed by a
+recovery sweep instead of emailing them."""
+
+from sqlalchemy import select, update
+
+from server.models import db, utcnow, ExportJob, User
+from server.seed import generate
+
+
+def queue_job(app, items):
+    app.config["EXPORT_CHUNK_SIZE"] = 10
+    generate(1, items, tags=20, creators=20)
+    user = db.session.scalars(select(User)).one()
+    job = ExportJob(user_id=user.id, email=user.email)
+    db.session.add(job)
+    db.session.commit()
+    return app.extensions["export_jobs"], job.id
+
+
+def test_progress_is_committed_per_chunk(app):
+    pool, job_id = queue_job(app, 25)
+
+    progress = []
+    advance = pool.advance
+
+    def record(job_id, stamp, **values):
+        if "rows_exported" in values:
+            progress.append(values["rows_exported"])
+        return advance(job_id, stamp, **values)
+
+    pool.advance = record
+    pool.process([job_id])
+
+    job = db.session.get(ExportJob, job_id)
+    assert progress == [0, 10, 20, 25]
+    assert (job.status, job.rows_exported, job.total_rows) == ("sent", 25, 25)
+    assert len(pool.transport.outbox) == 1
+
+
+def test_reclaimed_job_is_not_emailed(app):
+    pool, job_id = queue_job(app, 25)
+    build_csv = pool.build_csv
+
+    def reset_after_first_chunk(user_id, on_chunk):
+        def reclaim(rows):
+            on_chunk(rows)
+            # What a sweep in another process does to a job it thinks
+            # is stale.
+            db.session.execute(
+                update(ExportJob)
+                .where(ExportJob.id == job_id)
+                .values(status="pending", updated_at=utcnow())
+            )
+            db.session.commit()
+
+        return build_csv(user_id, reclaim)
+
+    pool.build_csv = reset_after_first_chunk
+    pool.process([job_id])
+
+    assert db.session.get(ExportJob, job_id).status == "pending"
+    assert pool.transport.outbox == []
@@ -0,0 +1,53 @@
+"""Bad rows in a bulk import are reported per row; the rest still import."""
+
+import json
+
+from server.models import db, Category, User
+
+
+def create_user():
+    user = User(
+        username="importer", first_name="Im", last_name="Porter",
+        email="importer@example.com", password="password",
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def bulk_import(client, user_id, body, content_type):
+    return client.post(
+        f"/items/bulk?user_id={user_id}", data=body, content_type=content_type,
+    )
+
+
+def test_non_string_json_values_are_row_errors(app, client):
+    user_id = create_user()
+    lines = [
+        {"title": "Kept", "category_name": "Books", "tags": ["a"]},
+        {"title": 5, "category_name": "Books"},
+        {"title": "ok", "category_name": ["x"]},
+        {"title": "t", "category_name": "B", "image_url": 7},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines)
+
+    response = bulk_import(client, user_id, body, "application/x-ndjson")
+
+    assert response.status_code == 201
+    assert response.json["created"] == 1
+    assert response.json["row_errors"] == [
+        {"row": 2, "errors": ["title must be a string"]},
+        {"row": 3, "errors": ["category_name must be a string"]},
+        {"row": 4, "errors": ["image_url must be a string"]},
+    ]
+    assert db.session.scalars(db.select(Category.name)).all() == ["Books"]
+
+
+def test_unparseable_csv_is_rejected(app, client):
+    user_id = create_user()
+    body = "title,category_name\nBook,Books\n" + "x" * 200_000 + ",Books\n"
+
+    response = bulk_import(client, user_id, body, "text/csv")
+
+    assert response.status_code == 400
+    assert "could not be parsed" in response.json["errors"][0]
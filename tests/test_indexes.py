@@ -0,0 +1,102 @@
+"""The endpoint queries seek on the indexes from revision b7d2f4e81c36
+(and the link tables' composite keys) instead of scanning tables."""
+
+import pytest
+from sqlalchemy import select
+
+from server.models import db, Item, Tag
+from server.seed import generate
+
+
+@pytest.fixture
+def seeded(app):
+    generate(20, 200, seed=1)
+    db.session.execute(db.text("ANALYZE"))
+    db.session.commit()
+    user_id = 1
+    item_id = db.session.scalar(
+        select(Item.id).where(Item.user_id == user_id, Item.rating_count > 0).limit(1)
+    )
+    category_id = db.session.scalar(
+        select(Item.category_id).where(Item.user_id == user_id).limit(1)
+    )
+    return {"user_id": user_id, "item_id": item_id, "category_id": category_id}
+
+
+def query_plan(statement, parameters=()):
+    connection = db.engine.raw_connection()
+    try:
+        rows = connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    finally:
+        connection.close()
+    return [row[-1] for row in rows]
+
+
+def request_plans(client, recorder, url, table):
+    """Query plans of the statements ``url`` runs that read ``table``."""
+    recorder.statements.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+
+    plans = [
+        query_plan(statement, parameters)
+        for statement, parameters in recorder.statements
+        if f"FROM {table}" in statement
+    ]
+    assert plans, f"{url} ran no query on {table}"
+    return plans
+
+
+def assert_seeks(plans, table, indexes):
+    for plan in plans:
+        steps = [step for step in plan if f" {table} " in f"{step} "]
+        assert steps, plan
+        for step in steps:
+            assert not step.startswith("SCAN"), plan
+            assert any(f"INDEX {index} " in step for index in indexes), plan
+
+
+def test_item_list_seeks_user_title_index(client, recorder, seeded):
+    plans = request_plans(
+        client, recorder, f"/items?user_id={seeded['user_id']}&limit=50", "items"
+    )
+    assert_seeks(plans, "items", ["ix_items_user_id_title"])
+
+
+def test_item_list_by_category_seeks_user_index(client, recorder, seeded):
+    url = f"/items?user_id={seeded['user_id']}&category_id={seeded['category_id']}"
+    plans = request_plans(client, recorder, url, "items")
+    # Either index bounds the read to one user's items; SQLite prefers
+    # the one that also gives the ORDER BY for free.
+    assert_seeks(plans, "items", ["ix_items_user_id_title", "ix_items_user_id_category_id"])
+
+
+def test_item_reviews_seek_item_id_index(client, recorder, seeded):
+    plans = request_plans(
+        client, recorder, f"/items/{seeded['item_id']}/reviews?limit=10", "reviews"
+    )
+    assert_seeks(plans, "reviews", ["ix_reviews_item_id_id"])
+
+
+@pytest.mark.parametrize("table", ["item_tags", "item_creators"])
+def test_link_names_seek_composite_key(client, recorder, seeded, table):
+    plans = request_plans(
+        client, recorder, f"/items?user_id={seeded['user_id']}&limit=50", table
+    )
+    assert_seeks(plans, table, [f"sqlite_autoindex_{table}_1"])
+
+
+@pytest.mark.parametrize("table, column, index", [
+    ("item_tags", "tag_id", "ix_item_tags_tag_id_item_id"),
+    ("item_creators", "creator_id", "ix_item_creators_creator_id_item_id"),
+])
+def test_reverse_link_lookup_seeks_reverse_index(seeded, table, column, index):
+    # The statement the search triggers run when a tag or creator is renamed.
+    tag_id = db.session.scalar(select(Tag.id).limit(1))
+    plan = query_plan(f"SELECT item_id FROM {table} WHERE {column} = ?", (tag_id,))
+    assert_seeks([plan], table, [index])
+
+
+def test_stats_seek_user_counts_key(client, recorder, seeded):
+    plans = request_plans(client, recorder, f"/users/{seeded['user_id']}/stats", "user_counts")
+    assert_seeks(plans, "user_counts", ["sqlite_autoindex_user_counts_1"])
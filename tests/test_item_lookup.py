@@ -0,0 +1,23 @@
+"""GET /items?ids= returns items and missing ids in the order asked for."""
+
+from sqlalchemy import select
+
+from server.models import db, Item
+from server.seed import generate
+
+
+def test_lookup_keeps_requested_order(client):
+    generate(2, 5)
+    first, second = (
+        db.session.scalars(select(Item.id).where(Item.user_id == user_id).order_by(Item.id)).all()
+        for user_id in (1, 2)
+    )
+    ids = [first[3], 999, first[0], second[0], first[3], 998, first[2]]
+
+    response = client.get(
+        f"/items?user_id=1&fields=id&ids={','.join(map(str, ids))}"
+    )
+
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json["results"]] == [first[3], first[0], first[2]]
+    assert response.json["missing"] == [999, second[0], 998]
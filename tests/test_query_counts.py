@@ -0,0 +1,44 @@
+"""Item endpoints batch-load relations, so the number of SQL statements
+doesn't grow with the number of items."""
+
+import pytest
+from sqlalchemy import select
+
+from server.models import db, Item
+from server.seed import generate
+
+N = 30
+
+
+def statement_count(client, recorder, url):
+    recorder.statements.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    return len(recorder)
+
+
+def seed_items(count):
+    generate(1, count, reviews_per_item=2.0, tags=50, creators=50)
+    user_id, item_id = db.session.execute(
+        select(Item.user_id, Item.id).order_by(Item.id).limit(1)
+    ).one()
+    return user_id, item_id
+
+
+@pytest.mark.parametrize("path", [
+    "/items?user_id={user_id}",
+    "/items?user_id={user_id}&limit=200",
+    "/items/{item_id}",
+    "/items/{item_id}?include=reviews,category",
+])
+def test_item_queries_stay_flat(app, client, recorder, path):
+    user_id, item_id = seed_items(N)
+    small = statement_count(client, recorder, path.format(user_id=user_id, item_id=item_id))
+
+    db.drop_all()
+    db.create_all()
+    user_id, item_id = seed_items(10 * N)
+    large = statement_count(client, recorder, path.format(user_id=user_id, item_id=item_id))
+
+    assert large == small
+    assert small <= 5
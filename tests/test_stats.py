@@ -0,0 +1,72 @@
+"""The stored per-user counts behind /users/<id>/stats follow every write
+path, so they always match a rebuild from the items themselves."""
+
+from sqlalchemy import select
+
+from server.models import db, Category, Item, Tag, Creator, UserCount
+from server.seed import generate
+from server.stats import rebuild_user_counts
+
+
+def stored_counts():
+    return set(db.session.execute(
+        select(UserCount.user_id, UserCount.kind, UserCount.key_id, UserCount.total)
+        .where(UserCount.total != 0)
+    ).all())
+
+
+def test_counts_follow_writes(app, client):
+    generate(2, 20, tags=10, creators=10)
+    user_id = 1
+    items = db.session.scalars(
+        select(Item.id).where(Item.user_id == user_id).order_by(Item.id)
+    ).all()
+    categories = db.session.scalars(
+        select(Category.id).where(Category.user_id == user_id).order_by(Category.id)
+    ).all()
+    tags = db.session.scalars(select(Tag.id).order_by(Tag.id)).all()
+    creators = db.session.scalars(select(Creator.id).order_by(Creator.id)).all()
+
+    def ok(response):
+        assert response.status_code in (200, 201), response.json
+        return response.json
+
+    new_item = ok(client.post("/items", json={
+        "title": "New", "category_id": categories[0], "user_id": user_id,
+    }))["id"]
+    ok(client.patch(f"/items/{items[0]}", json={"category_id": categories[1]}))
+    ok(client.post(f"/items/{new_item}/tags", json={"tag_ids": tags[:3]}))
+    ok(client.post(f"/items/{items[1]}/tags", json={"tag_ids": tags[2:5]}))
+    ok(client.patch(f"/items/{items[2]}/creators", json={
+        "add": creators[:2], "remove": creators[2:6],
+    }))
+    ok(client.patch("/items/tags", json={
+        "item_ids": items[:10], "add": tags[:2], "remove": tags[5:8],
+    }))
+
+    rated = ok(client.post("/reviews", json={
+        "item_id": new_item, "rating": 4, "user_id": user_id,
+    }))["id"]
+    unrated = ok(client.post("/reviews", json={"item_id": items[3], "user_id": 2}))["id"]
+    ok(client.patch(f"/reviews/{rated}", json={"rating": 2}))
+    ok(client.patch(f"/reviews/{unrated}", json={"rating": 5}))
+    ok(client.delete(f"/reviews/{rated}"))
+
+    ok(client.post(f"/items/bulk?user_id={user_id}", data=(
+        "title,category_name,tags,creators\n"
+        "Bulk 1,Podcast,Fresh; Fantasy,Someone New\n"
+        "Bulk 2,Podcast,Fresh,\n"
+    ), content_type="text/csv"))
+
+    ok(client.delete(f"/items/{items[4]}"))
+    ok(client.delete(f"/items?user_id={user_id}&ids={items[5]},{items[6]}"))
+    ok(client.delete(f"/items?user_id={user_id}&category_id={categories[1]}"))
+
+    counts = stored_counts()
+    stats = ok(client.get(f"/users/{user_id}/stats"))
+
+    rebuild_user_counts()
+    assert stored_counts() == counts
+    assert stats["item_count"] == db.session.scalar(
+        select(db.func.count()).select_from(Item).where(Item.user_id == user_id)
+    )
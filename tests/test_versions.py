@@ -0,0 +1,24 @@
+"""Rebuilding rating aggregates bumps every user's version, including
+users who have never had a version row."""
+
+from sqlalchemy import select, update
+
+from server.models import db, DataVersion, Item, User
+from server.seed import generate
+from server.versions import current_version, user_scope
+
+
+def test_rebuild_bumps_users_without_a_version_row(app):
+    generate(2, 5)
+    db.session.execute(db.delete(DataVersion))
+    db.session.execute(update(Item).values(rating_count=0, rating_sum=0))
+    db.session.commit()
+    user_ids = db.session.scalars(select(User.id)).all()
+
+    result = app.test_cli_runner().invoke(args=["rebuild-rating-aggregates"])
+
+    assert "item(s) corrected" in result.output
+    assert [current_version(user_scope(user_id)) for user_id in user_ids] == [1, 1]
+
+    app.test_cli_runner().invoke(args=["rebuild-user-counts"])
+    assert [current_version(user_scope(user_id)) for user_id in user_ids] == [2, 2]